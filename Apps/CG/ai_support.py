@@ -1,13 +1,28 @@
 import os
 import cv2
 import numpy as np
-import base64
 import json
 import re
 import asyncio
+import random
+import time
 import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
 from io import BytesIO
 from PIL import Image, ImageDraw, ImageFont
+from extraction_cache import cache_key, load_cached, store_cached
+
+EXTRACTION_MODEL = "gemini-2.0-flash"
+
+# Local text-presence detection
+DETECTION_WIDTH = 640
+TEXT_COVERAGE_FOR_CERTAINTY = 0.02  # Share of the frame covered by text-like lines
+
+# Quota / rate-limit errors (HTTP 429) retried with backoff in bulk extraction
+RATE_LIMIT_ERRORS = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.TooManyRequests,
+)
 
 
 # Necessary
@@ -116,45 +131,258 @@ As per my program's response, the posssible text you would find is as follows:
 )
 
 
-async def extract_text_from_image(image_path):
+def estimate_text_presence(frame):
     """
-    Extracts text from an image using Gemini's multimodal capabilities asynchronously.
+    Cheap CPU-only confidence (0..1) that an RGB frame contains text.
+
+    Text lines show up as dense, horizontally connected clusters of strong
+    strokes, so we threshold the morphological gradient, join neighbouring
+    glyphs and measure how much of the frame is covered by line-shaped blobs.
     """
-    try:
-        with Image.open(image_path) as img:
-            img_format = img.format.lower()
-            if not img_format:
-                return "Error: Could not determine image format."
+    gray = cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY) if frame.ndim == 3 else frame
 
-            buffered = BytesIO()
-            img.save(buffered, format=img.format)
-            base64_encoded_image = base64.b64encode(buffered.getvalue()).decode("utf-8")
-            buffered.close()  # Close buffer to free resources
+    # Work at a fixed width so the shape thresholds don't depend on resolution
+    scale = DETECTION_WIDTH / gray.shape[1]
+    if scale < 1:
+        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
 
-        image_part = {
-            "mime_type": f"image/{img_format}",
-            "data": base64_encoded_image,
-        }
+    gradient = cv2.morphologyEx(
+        gray, cv2.MORPH_GRADIENT, cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
+    )
+    _, strokes = cv2.threshold(gradient, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+    lines = cv2.morphologyEx(
+        strokes, cv2.MORPH_CLOSE, cv2.getStructuringElement(cv2.MORPH_RECT, (9, 1))
+    )
+    count, _, stats, _ = cv2.connectedComponentsWithStats(lines, connectivity=8)
+    if count <= 1:
+        return 0.0
+
+    # Vectorized filtering of the blobs (label 0 is the background)
+    x, y, w, h, _ = stats[1:].T
+    max_height = 0.2 * gray.shape[0]
+    candidates = (h >= 6) & (h <= max_height) & (w >= 1.5 * h)
+    if not candidates.any():
+        return 0.0
+
+    # Real text mixes stroke and gap pixels; solid shapes or noise don't
+    integral = cv2.integral(strokes // 255)
+    x, y, w, h = x[candidates], y[candidates], w[candidates], h[candidates]
+    ink = (
+        integral[y + h, x + w] - integral[y, x + w] - integral[y + h, x] + integral[y, x]
+    )
+    fill = ink / (w * h)
+    text_like = (fill > 0.2) & (fill < 0.85)
+
+    coverage = (w[text_like] * h[text_like]).sum() / gray.size
+    return float(min(1.0, coverage / TEXT_COVERAGE_FOR_CERTAINTY))
 
-        model = genai.GenerativeModel("gemini-2.0-flash")
-
-        # Use asyncio to handle the API request
-        response = await asyncio.to_thread(
-            model.generate_content,
-            {"parts": [{"text": text_extraction_req}, image_part]},
-        )
-
-        result = response.text
-        match = re.search(r"\[\s*{.*}\s*\]", result, re.DOTALL)
-        if match:
-            json_text = match.group(0)
-            return json.loads(json_text), result
-        else:
-            return None, "Not Found"
+
+async def detect_text_with_gemini(frame):
+    """Ask Gemini whether an RGB frame contains any text (one network call)."""
+    ok, encoded = cv2.imencode(".jpg", cv2.cvtColor(frame, cv2.COLOR_RGB2BGR))
+    if not ok:
+        raise ValueError("Could not encode frame.")
+
+    model = genai.GenerativeModel(EXTRACTION_MODEL)
+    response = await asyncio.to_thread(
+        model.generate_content,
+        {
+            "parts": [
+                {"text": text_detection_req},
+                {"mime_type": "image/jpeg", "data": encoded.tobytes()},
+            ]
+        },
+    )
+    return response.text.strip().startswith("1")
+
+
+async def detect_text(frame, low=0.15, high=0.6):
+    """
+    Decide whether a frame contains text, escalating only uncertain frames.
+
+    Returns:
+        (has_text, confidence, source) where source is "local" or "gemini"
+    """
+    confidence = estimate_text_presence(frame)
+    if confidence >= high:
+        return True, confidence, "local"
+    if confidence <= low:
+        return False, confidence, "local"
+    return await detect_text_with_gemini(frame), confidence, "gemini"
+
+
+async def extract_text_from_image(image_path, use_cache=True, max_edge=None):
+    """
+    Extracts text from an image using Gemini's multimodal capabilities asynchronously.
+
+    Results are cached on disk by image content, prompt and model; pass
+    use_cache=False to always call the API. With max_edge, large images are
+    downscaled before upload and boxes are mapped back to source pixels.
+    """
+    try:
+        return await request_extraction(image_path, use_cache, max_edge)
     except FileNotFoundError:
         return "Error: Image file not found."
     except Exception as e:
         return f"An error occurred: {e}"
 
 
+def sniff_mime_type(image_bytes):
+    """Return the MIME type of formats Gemini accepts as-is, else None."""
+    if image_bytes.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if image_bytes.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if image_bytes[:4] == b"RIFF" and image_bytes[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+def prepare_image_part(image_bytes, max_edge=None):
+    """
+    Build the request part for an image, avoiding a decode when possible.
+
+    JPEG/PNG/WebP bytes are sent exactly as stored on disk. Other formats
+    are re-encoded as PNG. With max_edge, larger images are downscaled to
+    fit and sent as JPEG.
+
+    Returns:
+        (image_part, scale) where scale maps request pixels to source pixels
+    """
+    mime_type = sniff_mime_type(image_bytes)
+    if mime_type and not max_edge:
+        return {"mime_type": mime_type, "data": image_bytes}, 1.0
+
+    with Image.open(BytesIO(image_bytes)) as img:
+        longest = max(img.size)
+        if max_edge and longest > max_edge:
+            scale = longest / max_edge
+            img = img.convert("RGB").resize(
+                (round(img.width / scale), round(img.height / scale)),
+                Image.LANCZOS,
+            )
+            buffered = BytesIO()
+            img.save(buffered, format="JPEG", quality=90)
+            return {"mime_type": "image/jpeg", "data": buffered.getvalue()}, scale
+
+        if mime_type:
+            return {"mime_type": mime_type, "data": image_bytes}, 1.0
+
+        buffered = BytesIO()
+        img.save(buffered, format="PNG")
+        return {"mime_type": "image/png", "data": buffered.getvalue()}, 1.0
+
+
+def rescale_layout(parsed, scale):
+    """Map bounding boxes and font sizes from request pixels back to source pixels."""
+    if scale == 1.0:
+        return parsed
+
+    for item in parsed:
+        box = item.get("bounding_box")
+        if isinstance(box, dict):
+            for axis in ("x1", "y1", "x2", "y2"):
+                if isinstance(box.get(axis), (int, float)):
+                    box[axis] = round(box[axis] * scale)
+        if isinstance(item.get("font_size"), (int, float)):
+            item["font_size"] = round(item["font_size"] * scale)
+    return parsed
+
+
+async def request_extraction(image_path, use_cache=True, max_edge=None):
+    """Same as extract_text_from_image, but lets API errors propagate."""
+    with open(image_path, "rb") as f:
+        image_bytes = f.read()
+
+    # Downscaled requests may localize text differently, so cache them apart
+    key = cache_key(
+        image_bytes, text_extraction_req, EXTRACTION_MODEL, f"max_edge={max_edge}"
+    )
+    if use_cache:
+        cached = load_cached(key)
+        if cached is not None:
+            return cached, "Cached"
+
+    image_part, scale = prepare_image_part(image_bytes, max_edge)
+
+    model = genai.GenerativeModel(EXTRACTION_MODEL)
+
+    # Use asyncio to handle the API request
+    response = await asyncio.to_thread(
+        model.generate_content,
+        {"parts": [{"text": text_extraction_req}, image_part]},
+    )
+
+    result = response.text
+    match = re.search(r"\[\s*{.*}\s*\]", result, re.DOTALL)
+    if match:
+        json_text = match.group(0)
+        parsed = rescale_layout(json.loads(json_text), scale)
+        if use_cache:
+            store_cached(key, parsed)
+        return parsed, result
+    else:
+        return None, "Not Found"
+
+
+async def extract_text_bulk(
+    image_paths,
+    concurrency=4,
+    max_retries=5,
+    base_delay=1.0,
+    use_cache=True,
+    max_edge=None,
+):
+    """
+    Extract text from many images with at most `concurrency` requests in flight.
+
+    Rate-limited requests are retried with full-jitter exponential backoff.
+    Results are yielded as they complete (not in input order) as dicts with
+    path, parsed, raw, error, attempts and latency (seconds, incl. retries).
+    image_paths may be any iterable; it is consumed lazily.
+    """
+
+    async def run_one(path):
+        started = time.perf_counter()
+        parsed, raw, error = None, None, None
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                parsed, raw = await request_extraction(path, use_cache, max_edge)
+                break
+            except RATE_LIMIT_ERRORS as e:
+                if attempt > max_retries:
+                    error = f"Rate limited after {attempt} attempts: {e}"
+                    break
+                await asyncio.sleep(random.uniform(0, base_delay * 2 ** (attempt - 1)))
+            except Exception as e:
+                error = str(e)
+                break
+
+        return {
+            "path": path,
+            "parsed": parsed,
+            "raw": raw,
+            "error": error,
+            "attempts": attempt,
+            "latency": time.perf_counter() - started,
+        }
+
+    paths = iter(image_paths)
+    pending = set()
+    exhausted = False
+    while True:
+        # Top up the in-flight set without materializing the whole iterator
+        while not exhausted and len(pending) < concurrency:
+            try:
+                pending.add(asyncio.create_task(run_one(next(paths))))
+            except StopIteration:
+                exhausted = True
+
+        if not pending:
+            return
 
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            yield task.result()
@@ -0,0 +1,168 @@
+import argparse
+import asyncio
+import copy
+import csv
+import json
+import os
+import re
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from media import process_media
+from ai_support import recieve_api_key, extract_text_bulk
+from main import DEFAULT_STYLE_CONFIG, build_media_params
+
+VIDEO_EXTENSIONS = {".mp4", ".mov", ".mkv", ".webm", ".avi"}
+
+
+def load_manifest(manifest_path):
+    """
+    Load batch jobs from a JSONL or CSV manifest.
+
+    Each job needs "source" (frame to extract the layout from) and
+    "background" (image or video to render on). Optional fields: "quote"
+    (defaults to the extracted text), "author", "label", "style" (partial
+    style config, a JSON string in CSV), "line_breaking", "auto_fit",
+    "video_options" and "output".
+    """
+    with open(manifest_path, encoding="utf-8", newline="") as f:
+        if manifest_path.lower().endswith(".csv"):
+            jobs = [dict(row) for row in csv.DictReader(f)]
+        else:
+            jobs = [json.loads(line) for line in f if line.strip()]
+
+    for job in jobs:
+        for key in ("style", "video_options"):
+            if isinstance(job.get(key), str):
+                job[key] = json.loads(job[key]) if job[key].strip() else None
+        missing = [key for key in ("source", "background") if not job.get(key)]
+        if missing:
+            raise ValueError(f"Manifest job is missing {missing}: {job}")
+
+    return jobs
+
+
+def merge_style(overrides):
+    """Merge a partial style config over the defaults."""
+    style_config = copy.deepcopy(DEFAULT_STYLE_CONFIG)
+    for section, values in (overrides or {}).items():
+        style_config.setdefault(section, {}).update(values)
+
+    # JSON has no tuples, but PIL expects color tuples
+    for values in style_config.values():
+        if isinstance(values.get("color"), list):
+            values["color"] = tuple(values["color"])
+    return style_config
+
+
+def output_name(index, job, out_dir):
+    """Unique output path for a job, keeping the background's media type."""
+    if job.get("output"):
+        return job["output"]
+
+    stem, ext = os.path.splitext(os.path.basename(job["background"]))
+    is_video = ext.lower() in VIDEO_EXTENSIONS
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", stem).strip("-") or "job"
+    return os.path.join(out_dir, f"{index:04d}-{slug}.{'mp4' if is_video else 'jpg'}")
+
+
+def render_job(job):
+    """Render one prepared job (runs in a worker process)."""
+    # Fonts and decoded backgrounds are cached per worker process, so jobs
+    # sharing them only pay the loading cost once per worker
+    is_video = os.path.splitext(job["background"])[1].lower() in VIDEO_EXTENSIONS
+    return process_media(
+        is_video=is_video,
+        media_path=job["background"] if is_video else job["source"],
+        overlay_img_path=None if is_video else job["background"],
+        video_options=job.get("video_options"),
+        output_path=job["output"],
+        line_breaking=job.get("line_breaking") or "greedy",
+        auto_fit=str(job.get("auto_fit")).lower() in ("1", "true", "yes"),
+        **job["params"],
+    )
+
+
+async def extract_layouts(sources, concurrency=4):
+    """Call Gemini once per distinct source frame, a few at a time."""
+    layouts = {}
+    async for result in extract_text_bulk(sources, concurrency=concurrency):
+        if result["parsed"]:
+            layouts[result["path"]] = result["parsed"]
+            print(f"Extracted {result['path']} in {result['latency']:.2f}s")
+        else:
+            print(
+                f"⚠️ Warning: No text data extracted from {result['path']}: "
+                f"{result['error'] or result['raw']}"
+            )
+    return layouts
+
+
+async def run_batch(manifest_path, out_dir="outputs", workers=None):
+    """Render every job in the manifest, reusing extractions across jobs."""
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key or not recieve_api_key(api_key):
+        raise ValueError("API key missing or configuration failed")
+
+    jobs = load_manifest(manifest_path)
+    os.makedirs(out_dir, exist_ok=True)
+
+    layouts = await extract_layouts(sorted({job["source"] for job in jobs}))
+
+    # Build render params in the parent; workers only receive plain data
+    prepared = []
+    for index, job in enumerate(jobs):
+        parsed_data = layouts.get(job["source"])
+        if not parsed_data:
+            continue
+        try:
+            quote = job.get("quote") or " ".join(
+                item["text"] for item in parsed_data if "text" in item
+            )
+            params = build_media_params(
+                parsed_data,
+                quote,
+                job.get("author") or "none",
+                job.get("label") or "none",
+                merge_style(job.get("style")),
+            )
+        except (ValueError, KeyError) as e:
+            print(f"❌ Skipping job {index}: {e}")
+            continue
+        prepared.append(
+            {
+                **job,
+                "params": params,
+                "output": output_name(index, job, out_dir),
+            }
+        )
+
+    # Group jobs by background so workers hit their caches more often
+    prepared.sort(key=lambda job: job["background"])
+
+    outputs = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(render_job, job): job for job in prepared}
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"❌ Job for {job['output']} failed: {e}")
+                traceback.print_exc()
+                continue
+            if result:
+                print(f"✅ {result}")
+                outputs.append(result)
+
+    print(f"Rendered {len(outputs)}/{len(jobs)} jobs.")
+    return outputs
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render many quote variants at once.")
+    parser.add_argument("manifest", help="JSONL or CSV manifest of jobs")
+    parser.add_argument("--out-dir", default="outputs")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    asyncio.run(run_batch(args.manifest, args.out_dir, args.workers))
@@ -0,0 +1,106 @@
+import numpy as np
+from PIL import Image, ImageDraw
+
+
+class PremultipliedOverlay:
+    """Text overlay rasterized once and stored with premultiplied alpha."""
+
+    def __init__(self, color, alpha, origin=(0, 0)):
+        self.color = color  # float32 (h, w, 3), already multiplied by alpha
+        self.alpha = alpha  # float32 (h, w, 1) in [0, 1]
+        self.origin = origin  # (x, y) of the overlay's top-left corner in the frame
+
+    @property
+    def region(self):
+        """Frame rectangle (x1, y1, x2, y2) covered by the overlay."""
+        x, y = self.origin
+        height, width = self.alpha.shape[:2]
+        return x, y, x + width, y + height
+
+
+class FadeCache:
+    """
+    Fades a full-opacity overlay by scaling its alpha, in 8.8 fixed point.
+
+    The overlay is prepared once (uint8 premultiplied color, float alpha)
+    and fade alphas are quantized to `levels` steps. Each frame derives its
+    level's inverse alpha from the single-channel alpha and scales the color
+    with integer multiplies; levels aren't memoized, since a fade sweeps
+    them one way and almost never revisits one.
+    """
+
+    def __init__(self, overlay, levels=32):
+        self.overlay = overlay
+        self.levels = levels
+        # Capping color at floor(255 * alpha) keeps frame * inverse + color
+        # + rounding within uint16 at every level
+        self.color = np.minimum(
+            np.rint(overlay.color), np.floor(overlay.alpha * 255)
+        ).astype(np.uint8)
+
+    def factor(self, level):
+        """Fade at a quantized level, as an integer out of 256."""
+        return round(level * 256 / self.levels)
+
+    def inverse(self, level):
+        """256 - alpha * fade * 256 at a quantized level, as uint16."""
+        coverage = np.rint(self.overlay.alpha * self.factor(level))
+        return (256 - coverage).astype(np.uint16)
+
+    def blend_into(self, frame, fade=1.0):
+        """Composite the overlay faded to `fade` onto frame in place."""
+        level = round(min(max(fade, 0.0), 1.0) * self.levels)
+        x1, y1, x2, y2 = self.overlay.region
+        if level == 0 or x1 == x2 or y1 == y2:
+            return frame
+
+        roi = frame[y1:y2, x1:x2]
+        blended = np.multiply(roi, self.inverse(level), dtype=np.uint16)
+        blended += np.multiply(self.color, self.factor(level), dtype=np.uint16)
+        blended += 128  # Round instead of truncating
+        blended >>= 8
+        roi[...] = blended
+        return frame
+
+
+def content_bounds(alpha):
+    """Union rectangle (x1, y1, x2, y2) of all non-transparent pixels."""
+    coverage = alpha[..., 0] > 0
+    rows = np.flatnonzero(coverage.any(axis=1))
+    cols = np.flatnonzero(coverage.any(axis=0))
+    if rows.size == 0:
+        return 0, 0, 0, 0
+    return int(cols[0]), int(rows[0]), int(cols[-1]) + 1, int(rows[-1]) + 1
+
+
+def rasterize_overlay(size, draw_fn):
+    """
+    Rasterize everything draw_fn draws into a premultiplied RGBA overlay.
+
+    Args:
+        size: (width, height) of the frames the overlay will be blended into
+        draw_fn: Callable receiving an RGBA ImageDraw to draw the text layer
+
+    Returns:
+        PremultipliedOverlay cropped to the union of every element drawn
+    """
+    # Draw the layer over black and over white using the same RGBA blending
+    # PIL applies per frame; the difference recovers alpha and the black
+    # pass already holds the premultiplied color.
+    passes = []
+    for base in ((0, 0, 0), (255, 255, 255)):
+        canvas = Image.new("RGB", size, base)
+        draw_fn(ImageDraw.Draw(canvas, "RGBA"))
+        passes.append(np.asarray(canvas, dtype=np.float32))
+
+    on_black, on_white = passes
+    alpha = 1.0 - (on_white - on_black).mean(axis=2, keepdims=True) / 255.0
+    alpha = np.clip(alpha, 0.0, 1.0)
+
+    # Keep only the rectangle the quote, author, label and backgrounds touch
+    x1, y1, x2, y2 = content_bounds(alpha)
+    return PremultipliedOverlay(
+        np.ascontiguousarray(on_black[y1:y2, x1:x2]),
+        np.ascontiguousarray(alpha[y1:y2, x1:x2]),
+        origin=(x1, y1),
+    )
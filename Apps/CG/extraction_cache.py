@@ -0,0 +1,62 @@
+import hashlib
+import json
+import os
+import time
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "extraction")
+MAX_CACHE_BYTES = 64 * 1024 * 1024
+
+
+def cache_key(image_bytes, prompt, model_name, *variant):
+    """Content address for an extraction: image bytes + prompt + model (+ options)."""
+    digest = hashlib.sha256()
+    parts = [prompt, model_name, *variant]
+    for part in (image_bytes, *(p.encode("utf-8") for p in parts)):
+        digest.update(len(part).to_bytes(8, "little"))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+def load_cached(key, cache_dir=CACHE_DIR):
+    """Return the cached parsed bounding-box JSON for key, or None on a miss."""
+    path = os.path.join(cache_dir, f"{key}.json")
+    try:
+        with open(path, encoding="utf-8") as f:
+            entry = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+    # Touch the entry so eviction treats it as recently used
+    os.utime(path, None)
+    return entry["parsed"]
+
+
+def store_cached(key, parsed, cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+    """Persist a parsed extraction result, then evict down to max_bytes."""
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f"{key}.json")
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"parsed": parsed, "stored_at": time.time()}, f)
+    os.replace(tmp_path, path)  # Atomic, so concurrent readers never see half a file
+
+    evict(cache_dir, max_bytes)
+
+
+def evict(cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+    """Delete least recently used entries until the cache fits in max_bytes."""
+    entries = []
+    for entry in os.scandir(cache_dir):
+        if entry.is_file() and entry.name.endswith(".json"):
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
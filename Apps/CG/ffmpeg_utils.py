@@ -0,0 +1,366 @@
+import os
+import re
+import subprocess
+import tempfile
+from fractions import Fraction
+import numpy as np
+from moviepy.config import FFMPEG_BINARY
+
+# Pixel formats that subsample chroma 2x2 and so need even frame dimensions
+SUBSAMPLED_PIX_FMTS = {"yuv420p", "yuvj420p", "nv12", "yuv420p10le"}
+
+# x264 profile names for the h264 stream profiles ffmpeg reports
+X264_PROFILES = {
+    "Constrained Baseline": "baseline",
+    "Baseline": "baseline",
+    "Main": "main",
+    "High": "high",
+    "High 10": "high10",
+    "High 4:2:2": "high422",
+    "High 4:4:4 Predictive": "high444",
+}
+
+# Audio codecs the MP4 container can carry as-is, so muxing can stream-copy them
+MP4_AUDIO_CODECS = {"aac", "mp3", "alac", "ac3"}
+
+
+def run_ffmpeg(args, loglevel="error"):
+    """Run ffmpeg with the given arguments and return the completed process."""
+    return subprocess.run(
+        [FFMPEG_BINARY, "-hide_banner", "-loglevel", loglevel, "-y", *args],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+
+
+def probe_info(path):
+    """Return ffmpeg's stream/format summary for a file (its stderr)."""
+    # ffmpeg exits non-zero without an output file, but still prints stream info
+    result = subprocess.run(
+        [FFMPEG_BINARY, "-hide_banner", "-i", path],
+        capture_output=True,
+        text=True,
+    )
+    return result.stderr
+
+
+def probe_video_codec(path):
+    """Return the codec name of the first video stream (e.g. "h264"), or None."""
+    match = re.search(r"Stream #\S+.*?: Video: (\w+)", probe_info(path))
+    return match.group(1) if match else None
+
+
+def probe_sps(path):
+    """Level and reference frame count read from the first h264 SPS."""
+    # trace_headers prints every parsed header field without decoding any frames
+    result = run_ffmpeg(
+        [
+            "-i", path,
+            "-map", "0:v:0",
+            "-c", "copy",
+            "-bsf:v", "trace_headers",
+            "-frames:v", "1",
+            "-f", "null", "-",
+        ],
+        loglevel="info",
+    )
+    fields = re.findall(
+        r"\b(level_idc|max_num_ref_frames)\s+[01]+\s+=\s+(\d+)",
+        result.stderr,
+    )
+    return {name: int(value) for name, value in fields}
+
+
+def probe_splice_params(path):
+    """
+    Encoder settings that make a re-encoded h264 window splice cleanly with
+    segments stream-copied from the source.
+
+    Returns:
+        dict with codec, profile, level, refs, pix_fmt and timescale, or None
+        if any of them can't be determined (the caller should not splice)
+    """
+    stream = re.search(r"Stream #\S+.*?: Video: (.*)", probe_info(path))
+    if not stream:
+        return None
+    line = stream.group(1)
+
+    # Only h264 splices: the concat demuxer adds in-band parameter sets for
+    # copied h264 segments (h264_mp4toannexb), but not for hevc
+    codec = re.match(r"(\w+)", line).group(1)
+    if codec != "h264":
+        return None
+    profile = re.match(r"\w+ \(([^)]+)\)", line)
+    pix_fmt = re.search(r", ([a-z0-9]+)[(,]", line)
+    timescale = re.search(r"([\d.]+)(k?) tbn", line)
+    profile = profile and X264_PROFILES.get(profile.group(1))
+    if not (profile and pix_fmt and timescale):
+        return None
+
+    sps = probe_sps(path)
+    if not sps.get("level_idc"):
+        return None
+
+    number, kilo = timescale.groups()
+    return {
+        "codec": codec,
+        "profile": profile,
+        "level": f"{sps['level_idc'] / 10:.1f}",
+        "refs": sps.get("max_num_ref_frames"),
+        "pix_fmt": pix_fmt.group(1),
+        "timescale": round(float(number) * (1000 if kilo else 1)),
+    }
+
+
+def splice_encoder_args(params):
+    """Output args pinning the encoder to the source's profile, level and timebase."""
+    # Parameter sets are repeated in-band at every keyframe, so the window
+    # decodes with its own SPS/PPS even though the joined MP4 only carries
+    # the first segment's in its sample description
+    x264_params = "repeat-headers=1"
+    if params["refs"]:
+        x264_params += f":ref={params['refs']}"
+    return [
+        "-profile:v", params["profile"],
+        "-level:v", params["level"],
+        "-x264-params", x264_params,
+        "-video_track_timescale", str(params["timescale"]),
+    ]
+
+
+def frame_rate(fps):
+    """Exact rate for ffmpeg's -r (29.97 -> "30000/1001", 24.0 -> "24")."""
+    # MoviePy reports NTSC rates rounded to two decimals; snap them back
+    ntsc = round(fps * 1.001)
+    if abs(fps - ntsc * 1000 / 1001) < 0.005 and abs(fps - ntsc) > 0.005:
+        return f"{ntsc * 1000}/1001"
+    return str(Fraction(fps).limit_denominator(1000))
+
+
+def probe_audio_codec(path):
+    """Return the codec name of the first audio stream (e.g. "aac"), or None."""
+    match = re.search(r"Stream #\S+.*?: Audio: (\w+)", probe_info(path))
+    return match.group(1) if match else None
+
+
+def probe_duration(path):
+    """Return the container duration in seconds, read from the header without decoding."""
+    match = re.search(r"Duration: (\d+):(\d+):([\d.]+)", probe_info(path))
+    if not match:
+        return None
+    hours, minutes, seconds = match.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def keyframe_times(path):
+    """Return the sorted presentation times (seconds) of every video keyframe."""
+    # Only keyframes are decoded, so this is far cheaper than a full decode
+    result = run_ffmpeg(
+        ["-skip_frame", "nokey", "-i", path, "-an", "-vf", "showinfo", "-f", "null", "-"],
+        loglevel="info",
+    )
+    # Use integer pts times the filter's time base: pts_time is printed
+    # rounded (6 significant digits on older builds)
+    time_base = re.search(r"time_base:\s*(\d+)/(\d+)", result.stderr)
+    if time_base:
+        unit = Fraction(int(time_base.group(1)), int(time_base.group(2)))
+        pts = re.findall(r"\bpts:\s*(-?\d+)", result.stderr)
+        return sorted(float(int(p) * unit) for p in pts)
+    times = re.findall(r"pts_time:\s*([\d.]+)", result.stderr)
+    return sorted(float(t) for t in times)
+
+
+def cut_stream_copy(path, start, end, output_path):
+    """Copy the video stream between two keyframe times without re-encoding."""
+    run_ffmpeg(
+        [
+            "-ss", f"{start:.6f}",
+            "-i", path,
+            "-t", f"{end - start:.6f}",
+            "-map", "0:v:0",
+            "-c", "copy",
+            "-avoid_negative_ts", "make_zero",
+            output_path,
+        ]
+    )
+    return output_path
+
+
+def concat_segments(paths, output_path):
+    """Losslessly join segments that share codec parameters via the concat demuxer."""
+    with tempfile.NamedTemporaryFile(
+        "w", suffix=".txt", delete=False, encoding="utf-8"
+    ) as listing:
+        for path in paths:
+            escaped = os.path.abspath(path).replace("'", r"'\''")
+            listing.write(f"file '{escaped}'\n")
+
+    try:
+        run_ffmpeg(
+            ["-f", "concat", "-safe", "0", "-i", listing.name, "-c", "copy", output_path]
+        )
+    finally:
+        os.remove(listing.name)
+    return output_path
+
+
+def mux_audio(video_path, audio_source, output_path, duration):
+    """
+    Mux the first audio stream of audio_source onto video_path, looped to duration.
+
+    The audio is looped by the demuxer (-stream_loop) and trimmed with -t, so
+    it is never decoded when its codec can be copied into the output; other
+    codecs are transcoded to AAC. Without an audio stream, the video is
+    copied on its own.
+    """
+    audio_codec = probe_audio_codec(audio_source)
+    if audio_codec is None:
+        print(f"⚠️ Warning: No audio found in {audio_source}, writing video only.")
+        run_ffmpeg(["-i", video_path, "-map", "0:v:0", "-c", "copy", output_path])
+        return output_path
+
+    copy_audio = audio_codec in MP4_AUDIO_CODECS and output_path.lower().endswith(
+        (".mp4", ".m4v", ".mov")
+    )
+    run_ffmpeg(
+        [
+            "-i", video_path,
+            "-stream_loop", "-1",
+            "-i", audio_source,
+            "-map", "0:v:0",
+            "-map", "1:a:0",
+            "-c:v", "copy",
+            "-c:a", "copy" if copy_audio else "aac",
+            "-t", f"{duration:.6f}",
+            output_path,
+        ]
+    )
+    return output_path
+
+
+class FFmpegFrameReader:
+    """Decode a video to raw RGB frames, read straight into caller-owned buffers."""
+
+    def __init__(self, path):
+        self.proc = subprocess.Popen(
+            [
+                FFMPEG_BINARY, "-hide_banner", "-loglevel", "error",
+                "-i", path,
+                "-an",
+                "-f", "rawvideo",
+                "-pix_fmt", "rgb24",
+                "-",
+            ],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+
+    def read_into(self, buffer):
+        """Fill a C-contiguous uint8 (H, W, 3) buffer; False once the video ends."""
+        view = memoryview(buffer).cast("B")
+        filled = 0
+        while filled < len(view):
+            count = self.proc.stdout.readinto(view[filled:])
+            if not count:
+                return False
+            filled += count
+        return True
+
+    def close(self):
+        self.proc.stdout.close()
+        if self.proc.poll() is None:
+            self.proc.terminate()
+        self.proc.wait()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class FFmpegFrameWriter:
+    """
+    Encode raw RGB frames written straight from caller-owned buffers into ffmpeg.
+
+    Like MoviePy's writer, a 4:2:0 pix_fmt is only requested for even frame
+    sizes; odd sizes are left to the encoder's default (4:4:4 for libx264).
+    """
+
+    def __init__(
+        self,
+        path,
+        size,
+        fps,
+        codec="libx264",
+        preset="medium",
+        crf=23,
+        threads=None,
+        pix_fmt="yuv420p",
+        extra_args=(),  # Additional output options, placed before the path
+    ):
+        width, height = size
+        args = [
+            FFMPEG_BINARY, "-hide_banner", "-loglevel", "error", "-y",
+            "-f", "rawvideo",
+            "-pix_fmt", "rgb24",
+            "-s", f"{width}x{height}",
+            "-r", frame_rate(fps),
+            "-i", "-",
+            "-an",
+            "-c:v", codec,
+            "-preset", preset,
+            "-crf", str(crf),
+        ]
+        if pix_fmt and (
+            pix_fmt not in SUBSAMPLED_PIX_FMTS or (width % 2 == 0 and height % 2 == 0)
+        ):
+            args += ["-pix_fmt", pix_fmt]
+        if threads:
+            args += ["-threads", str(threads)]
+        args += list(extra_args)
+        # stderr goes to a file so a chatty encoder can never fill a pipe and block
+        self.log = tempfile.TemporaryFile()
+        self.proc = subprocess.Popen(
+            [*args, path], stdin=subprocess.PIPE, stderr=self.log
+        )
+        self.path = path
+
+    def write(self, frame):
+        """Write one uint8 (H, W, 3) frame without copying it (if C-contiguous)."""
+        if not frame.flags.c_contiguous:
+            frame = np.ascontiguousarray(frame)
+        self.proc.stdin.write(memoryview(frame).cast("B"))
+
+    def close(self):
+        try:
+            self.proc.stdin.close()
+        except BrokenPipeError:
+            pass  # ffmpeg already exited; its log says why
+        returncode = self.proc.wait()
+        self.log.seek(0)
+        stderr = self.log.read().decode(errors="replace")
+        self.log.close()
+        if returncode != 0:
+            raise RuntimeError(f"ffmpeg failed to encode {self.path}: {stderr}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class FrameRing:
+    """A small ring of preallocated frame buffers reused instead of allocating per frame."""
+
+    def __init__(self, size, count=2):
+        width, height = size
+        self.buffers = [np.empty((height, width, 3), dtype=np.uint8) for _ in range(count)]
+        self.index = 0
+
+    def next(self):
+        buffer = self.buffers[self.index]
+        self.index = (self.index + 1) % len(self.buffers)
+        return buffer
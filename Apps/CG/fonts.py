@@ -0,0 +1,37 @@
+import os
+from functools import lru_cache
+from PIL import ImageFont
+from text_metrics import measurer_for
+
+FONTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fonts")
+DEFAULT_FACE = "DejaVuSans"
+
+
+def discover_faces(fonts_dir=FONTS_DIR):
+    """Map face names (file stems, e.g. "DejaVuSans-Bold") to bundled font files."""
+    if not os.path.isdir(fonts_dir):
+        return {}
+    return {
+        os.path.splitext(name)[0]: os.path.join(fonts_dir, name)
+        for name in sorted(os.listdir(fonts_dir))
+        if name.lower().endswith((".ttf", ".otf"))
+    }
+
+
+FACES = discover_faces()
+
+
+def resolve_face(face):
+    """Path for a bundled face name; anything else (a path, "arial.ttf") is passed through."""
+    return FACES.get(face, face)
+
+
+@lru_cache(maxsize=128)
+def get_font(size, face=DEFAULT_FACE):
+    """Load a (face, size) once per process; least recently used entries are dropped."""
+    return ImageFont.truetype(resolve_face(face), int(size))
+
+
+def get_measurer(size, face=DEFAULT_FACE):
+    """Cached width measurements for the given (face, size)."""
+    return measurer_for(get_font(size, face))
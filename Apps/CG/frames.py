@@ -0,0 +1,92 @@
+import bisect
+import subprocess
+import cv2
+import numpy as np
+from ai_support import estimate_text_presence
+from ffmpeg_utils import keyframe_times
+
+
+def sample_frames(video_path, stride_seconds=0.5, start=0.0):
+    """
+    Yield (time, RGB frame) every stride_seconds, decoding as little as possible.
+
+    Between samples the reader only grab()s frames, and only sampled frames
+    are retrieve()d (converted). It seeks only when a keyframe lies between
+    the current position and the next sample, since a seek decodes forward
+    from the keyframe before its target anyway.
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise FileNotFoundError(f"Could not open video: {video_path}")
+
+    try:
+        keyframes = keyframe_times(video_path)
+    except (OSError, subprocess.CalledProcessError):
+        keyframes = []  # Unknown GOP: read linearly
+
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS) or 24
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        position = 0  # Index of the next frame grab() returns
+
+        for t in np.arange(start, frame_count / fps, stride_seconds):
+            target = int(round(t * fps))
+            if target >= frame_count:
+                break
+
+            # Last keyframe at or before the sample
+            k = bisect.bisect_right(keyframes, t) - 1
+            keyframe = int(round(keyframes[k] * fps)) if k >= 0 else 0
+            if target < position or keyframe > position:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+                position = target
+            while position < target:
+                if not cap.grab():
+                    return
+                position += 1
+
+            if not cap.grab():
+                break
+            position += 1
+            ok, frame = cap.retrieve()
+            if not ok:
+                break
+            yield float(t), cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    finally:
+        cap.release()
+
+
+def sharpness(frame):
+    """Variance of the Laplacian: higher means crisper edges (less blur)."""
+    gray = cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY)
+    return float(cv2.Laplacian(gray, cv2.CV_64F).var())
+
+
+def select_best_frame(video_path, stride_seconds=0.5, output_path="best_frame.jpg"):
+    """
+    Pick the frame whose text is most likely to be clearly readable.
+
+    Frames are scored by local text presence times sharpness (normalized
+    over the sampled frames), so blurred transition frames lose to crisp
+    ones. The winner is written to output_path for extract_text_from_image.
+
+    Returns:
+        (output_path, time, score), or None if no sampled frame shows text
+    """
+    # Track the best raw score online, holding only that one frame. Dividing
+    # by the max sharpness (the normalization) doesn't change which frame wins.
+    best = None  # (raw score, time, frame)
+    max_sharpness = 0.0
+    for t, frame in sample_frames(video_path, stride_seconds):
+        sharp = sharpness(frame)
+        max_sharpness = max(max_sharpness, sharp)
+        raw = estimate_text_presence(frame) * sharp
+        if best is None or raw > best[0]:
+            best = (raw, t, frame)
+
+    if best is None or best[0] <= 0:
+        return None
+
+    raw, t, frame = best
+    cv2.imwrite(output_path, cv2.cvtColor(frame, cv2.COLOR_RGB2BGR))
+    return output_path, t, float(raw / max(max_sharpness, 1e-6))
@@ -1,18 +1,31 @@
+from functools import lru_cache
 from PIL import Image, ImageDraw, ImageFont
-from utils import (
-    render_background,
-    render_text_element,
-)
-def load_images(base_img_path, overlay_img_path=None):
-    """Load the main image and optional overlay image."""
-    base_img = Image.open(base_img_path)
+from layout import build_layout_plan, draw_layout_plan
+
+
+@lru_cache(maxsize=32)
+def decode_image(img_path, size=None):
+    """Decode (and optionally resize) an image once per process; callers get copies."""
+    img = Image.open(img_path)
+    img.load()
+    return img.resize(size) if size else img
+
+
+def load_images(base_img_path, overlay_img_path=None, copy_base=True):
+    """
+    Load the main image and optional overlay image.
+
+    Pass copy_base=False when only the overlay is needed; the base image is
+    then returned as None instead of being copied.
+    """
+    base_img = decode_image(base_img_path)
+    base_copy = base_img.copy() if copy_base else None
 
     if overlay_img_path:
-        overlay_img = Image.open(overlay_img_path)
-        overlay_img = overlay_img.resize(base_img.size)
-        return base_img, overlay_img
+        overlay_img = decode_image(overlay_img_path, base_img.size)
+        return base_copy, overlay_img.copy()
 
-    return base_img, None
+    return base_copy, None
 
 
 def add_text_to_image(
@@ -38,53 +51,33 @@ def add_text_to_image(
     bg_type = None,
     padding_ratio=0.5,
     corner_radius=10,
+    layout_plan=None,  # Precomputed LayoutPlan; built from the arguments above if None
 ):
     draw = ImageDraw.Draw(image, "RGBA")
 
-    # Discern Background Mode
-    if use_background == "unified":
-        unified_background = True
-    elif use_background == "highlight_box":
-        unified_background = False
-    else:
-        unified_background = False
-        use_background = False
-
-    if use_background and unified_background:
-        render_background(
-            draw=draw,
-            use_background=use_background,
-            unified_background=unified_background,
+    if layout_plan is None:
+        layout_plan = build_layout_plan(
+            quote_data,
+            quote_dims,
+            quote_font,
+            quote_style,
+            quote_color,
+            author_data,
+            author_dims,
+            author_font,
+            author_style,
+            author_color,
+            label_data,
+            label_dims,
+            label_font,
+            label_style,
+            label_color,
+            use_background,
+            till=till,
             bg_color=bg_color,
+            bg_type=bg_type,
             padding_ratio=padding_ratio,
-            font=quote_font,
-            text=quote_data,
-            till= till,
-            bg_type = bg_type,
-            quote_dims=quote_dims,
         )
 
-    render_text_element(
-        draw,
-        quote_data,
-        quote_dims,
-        quote_font,
-        quote_color,
-        quote_style,
-        author_data,
-        author_dims,
-        author_font,
-        author_color,
-        author_style,
-        label_data,
-        label_dims,
-        label_font,
-        label_color,
-        label_style,
-        padding_ratio,
-        use_background,
-        unified_background,
-        bg_color,
-        bg_type,
-    )
+    draw_layout_plan(draw, layout_plan)
     return image
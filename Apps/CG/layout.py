@@ -0,0 +1,206 @@
+from dataclasses import dataclass
+from PIL import Image, ImageDraw
+from text_metrics import measurer_for
+from fonts import get_font
+from utils import apply_text_style, calc_bg_rect, get_text_metrics
+
+# Scratch canvas for multiline measurements (draw.multiline_textbbox needs a draw)
+_MEASURE_DRAW = ImageDraw.Draw(Image.new("RGB", (1, 1)))
+
+
+@dataclass(frozen=True, slots=True)
+class BoxPlan:
+    """A background rectangle, ready to draw."""
+
+    rect: tuple  # (x1, y1, x2, y2)
+    radius: int
+    color: tuple
+    rounded: bool
+
+
+@dataclass(frozen=True, slots=True)
+class LinePlan:
+    """One line of text after style transforms, with its final position."""
+
+    text: str
+    font: object
+    color: tuple
+    position: tuple  # (x, y) passed to draw.text
+    background: BoxPlan | None = None  # Per-line highlight box
+
+
+@dataclass(frozen=True, slots=True)
+class LayoutPlan:
+    """Everything needed to draw the text layer, measured once up front."""
+
+    lines: tuple
+    background: BoxPlan | None = None  # Unified background behind all quote lines
+
+
+def with_alpha(color, alpha):
+    """Return color as an RGBA tuple with its alpha scaled by the given factor."""
+    if not color:
+        return None
+    if len(color) == 4:
+        return (*color[:3], int(color[3] * alpha))
+    return (*color, int(255 * alpha))
+
+
+def resolve_background_mode(use_background):
+    """Map the background mode setting to (use_background, unified_background)."""
+    if use_background == "unified":
+        return True, True
+    if use_background == "highlight_box":
+        return True, False
+    return False, False
+
+
+def plan_lines(text_data, dims, font, color, style, padding_ratio, line_bg):
+    """Measure and position each line of one text element inside its boxes."""
+    measurer = measurer_for(font)
+    lines = []
+    for i, box in enumerate(dims):
+        text = apply_text_style(text_data.get(f"line-{i+1}", ""), style)
+
+        # Same metrics as get_text_metrics, served from the measurement cache
+        left, top, right, bottom = measurer.bbox(text)
+        text_width, text_height = right - left, bottom - top
+        padding = int(text_height * padding_ratio)
+
+        # Center text in bounding box
+        x = box["x1"] + ((box["x2"] - box["x1"]) - text_width) // 2
+        y = box["y1"] + ((box["y2"] - box["y1"]) - text_height) // 2
+
+        background = None
+        if line_bg:
+            bg_color, rounded = line_bg
+            background = BoxPlan(
+                tuple(calc_bg_rect(x, y, text_width, text_height, padding)),
+                padding // 2,
+                bg_color,
+                rounded,
+            )
+        lines.append(LinePlan(text, font, color, (x, y), background))
+    return lines
+
+
+def build_layout_plan(
+    quote_data,
+    quote_dims,
+    quote_font,
+    quote_style,
+    quote_color,
+    author_data=None,
+    author_dims=None,
+    author_font=None,
+    author_style=None,
+    author_color=None,
+    label_data=None,
+    label_dims=None,
+    label_font=None,
+    label_style=None,
+    label_color=None,
+    use_background=False,
+    till=None,
+    bg_color=(0, 0, 0, 180),
+    bg_type=None,
+    padding_ratio=0.5,
+):
+    """Compute the immutable layout shared by the image and video renderers."""
+    use_background, unified_background = resolve_background_mode(use_background)
+    rounded = bg_type != "regular"
+
+    background = None
+    if use_background and unified_background:
+        # Combine all quote lines for unified background
+        all_lines = "\n".join(
+            [quote_data[f"line-{i+1}"] for i in range(len(quote_dims))]
+        )
+        _, _, padding, radius = get_text_metrics(
+            _MEASURE_DRAW, all_lines, quote_font, padding_ratio
+        )
+        till = till if till is not None else quote_dims[-1]["y2"]
+        background = BoxPlan(
+            (
+                quote_dims[0]["x1"] - padding,
+                quote_dims[0]["y1"] - padding,
+                quote_dims[-1]["x2"] + padding,
+                till + padding,
+            ),
+            radius,
+            bg_color,
+            rounded,
+        )
+
+    line_bg = (bg_color, rounded) if use_background and not unified_background else None
+
+    lines = []
+    for text_data, dims, font, color, style in (
+        (quote_data, quote_dims, quote_font, quote_color, quote_style),
+        (author_data, author_dims, author_font, author_color, author_style),
+        (label_data, label_dims, label_font, label_color, label_style),
+    ):
+        if text_data and dims:
+            lines.extend(
+                plan_lines(text_data, dims, font, color, style, padding_ratio, line_bg)
+            )
+
+    return LayoutPlan(tuple(lines), background)
+
+
+def scale_layout_plan(plan, scale, offset=(0, 0)):
+    """
+    Map a plan onto a resized (and cropped) frame without re-running layout.
+
+    Coordinates become coord * scale - offset; fonts are swapped for the
+    registry's font at the scaled size.
+    """
+    dx, dy = offset
+
+    def point(x, y):
+        return round(x * scale - dx), round(y * scale - dy)
+
+    def box(plan_box):
+        if plan_box is None:
+            return None
+        x1, y1, x2, y2 = plan_box.rect
+        return BoxPlan(
+            (*point(x1, y1), *point(x2, y2)),
+            round(plan_box.radius * scale),
+            plan_box.color,
+            plan_box.rounded,
+        )
+
+    lines = tuple(
+        LinePlan(
+            line.text,
+            get_font(max(1, round(line.font.size * scale)), line.font.path),
+            line.color,
+            point(*line.position),
+            box(line.background),
+        )
+        for line in plan.lines
+    )
+    return LayoutPlan(lines, box(plan.background))
+
+
+def draw_box(draw, box, alpha=1.0):
+    """Draw a planned background box."""
+    fill = with_alpha(box.color, alpha)
+    if box.rounded:
+        draw.rounded_rectangle(box.rect, fill=fill, radius=box.radius)
+    else:
+        draw.rectangle(box.rect, fill=fill)
+
+
+def draw_layout_plan(draw, plan, alpha=1.0):
+    """Draw a precomputed layout; alpha fades text and backgrounds together."""
+    if plan.background:
+        draw_box(draw, plan.background, alpha)
+
+    for line in plan.lines:
+        if line.background:
+            draw_box(draw, line.background, alpha)
+        draw.text(
+            line.position, line.text, font=line.font, fill=with_alpha(line.color, alpha)
+        )
@@ -1,8 +1,10 @@
 import traceback
+import copy
 import os
 import asyncio
 from PIL import Image
 from media import process_media
+from frames import select_best_frame
 from ai_support import (
     recieve_api_key,
     extract_text_from_image,
@@ -12,6 +14,18 @@ from dotenv import load_dotenv
 load_dotenv()
 
 
+DEFAULT_STYLE_CONFIG = {
+    "quote": {"mode": "normal", "color": (255, 255, 255)},
+    "author": {"mode": "normal", "color": (255, 255, 255)},
+    "label": {"mode": "normal", "color": (255, 255, 255)},
+    "background": {
+        "mode": "unified", # "unified" or "highlight_box"
+        "type": "regular",
+        "color": (0, 0, 0),
+        "padding_ratio": 0.2,
+    },
+}
+
 
 async def process_image():
     try:
@@ -24,10 +38,20 @@ async def process_image():
 
         # File paths configuration
         source_img = "mid_frame-3.jpg"
+        source_video = None  # e.g. "sample/sample-vid-1.mp4" to pick the frame automatically
         target_img = "sample/vinland.jfif"
         target_video = "sample/vid-background-1.mp4"
         is_video = True
 
+        # Pick the clearest text frame from the source video, if given
+        if source_video:
+            best = select_best_frame(source_video)
+            if not best:
+                print("⚠️ Warning: No frame with text found in the source video.")
+                return
+            source_img, best_time, _ = best
+            print(f"Using frame at {best_time:.2f}s from {source_video}")
+
         # Extract text data from image
         parsed_data, result = await extract_text_from_image(source_img)
 
@@ -35,12 +59,6 @@ async def process_image():
             print("⚠️ Warning: No text data found in the image.")
             return
 
-        # Validate required fields
-        if not all(
-            "bounding_box" in item and "font_size" in item for item in parsed_data
-        ):
-            raise ValueError("Missing required fields in parsed data")
-
         # Content configuration
         quote = " ".join([item["text"] for item in parsed_data if "text" in item])
         author = "~Rurouni"  # Can be replaced with input("Enter the author's name: ").lower()
@@ -49,76 +67,10 @@ async def process_image():
         )
 
         # Step 1: Initialize style configuration
-        style_config = {
-            "quote": {"mode": "normal", "color": (255, 255, 255)},
-            "author": {"mode": "normal", "color": (255, 255, 255)},
-            "label": {"mode": "normal", "color": (255, 255, 255)},
-            "background": {
-                "mode": "unified", # "unified" or "highlight_box"
-                "type": "regular",
-                "color": (0, 0, 0),
-                "padding_ratio": 0.2,
-            },
-        }
-
-        # Step 2: Extract data from parsed results
-        extracted = {
-            "quote": {
-                "dims": [
-                    item["bounding_box"] for item in parsed_data if "text" in item
-                ],
-                "sizes": [item["font_size"] for item in parsed_data if "text" in item],
-                "text": [item["text"] for item in parsed_data if "text" in item],
-                "styles": style_config["quote"],  # Add styles here for consistency
-            },
-            "author": {
-                "dims": [
-                    item["bounding_box"] for item in parsed_data if "author" in item
-                ],
-                "sizes": [
-                    item["font_size"] for item in parsed_data if "author" in item
-                ],
-                "text": [item["author"] for item in parsed_data if "author" in item],
-                "styles": style_config["author"],  # Fixed: was using quote styles
-            },
-            "label": {
-                "dims": [
-                    item["bounding_box"] for item in parsed_data if "label" in item
-                ],
-                "sizes": [item["font_size"] for item in parsed_data if "label" in item],
-                "text": [item["label"] for item in parsed_data if "label" in item],
-                "styles": style_config["label"],  # Add styles here for consistency
-            },
-        }
-
-        # Step 3: Validate essential data
-        if len(extracted["quote"]["dims"]) < 1 or len(extracted["quote"]["sizes"]) < 1:
-            raise ValueError("Insufficient quote data extracted")
-
-        # Step 4: Process author and label configurations
-        config = process_metadata(author, label, extracted, style_config)
-
-        # Step 5: Complete background configuration
-        style_config["background"]["till"] = (
-            config["author"]["dims"][-1]["y2"]
-            if (
-                style_config["background"]["mode"] == "unified"
-                and author != "none"
-                and config["author"]["dims"]
-            )
-            else extracted["quote"]["dims"][-1]["y2"]  # Fallback to quote's Y2
-        )
+        style_config = copy.deepcopy(DEFAULT_STYLE_CONFIG)
 
-        # Step 6: Create final params object for process_media
-        params = {
-            "quote_data": extracted["quote"],
-            "new_quote_text": quote,
-            "author_data": config["author"],
-            "new_author_text": author,
-            "label_data": config["label"],
-            "new_label_text": label,
-            "background": style_config["background"],
-        }
+        # Step 2: Build process_media params from the parsed layout
+        params = build_media_params(parsed_data, quote, author, label, style_config)
 
         # Lastly, Apply modifications
         if is_video:
@@ -147,6 +99,77 @@ async def process_image():
         traceback.print_exc()
 
 
+def build_media_params(parsed_data, quote, author, label, style_config):
+    """Turn Gemini's parsed layout and the new content into process_media kwargs."""
+    # Validate required fields
+    if not all(
+        "bounding_box" in item and "font_size" in item for item in parsed_data
+    ):
+        raise ValueError("Missing required fields in parsed data")
+
+    # Step 1: Extract data from parsed results
+    extracted = {
+        "quote": {
+            "dims": [
+                item["bounding_box"] for item in parsed_data if "text" in item
+            ],
+            "sizes": [item["font_size"] for item in parsed_data if "text" in item],
+            "text": [item["text"] for item in parsed_data if "text" in item],
+            "styles": style_config["quote"],  # Add styles here for consistency
+        },
+        "author": {
+            "dims": [
+                item["bounding_box"] for item in parsed_data if "author" in item
+            ],
+            "sizes": [
+                item["font_size"] for item in parsed_data if "author" in item
+            ],
+            "text": [item["author"] for item in parsed_data if "author" in item],
+            "styles": style_config["author"],  # Fixed: was using quote styles
+        },
+        "label": {
+            "dims": [
+                item["bounding_box"] for item in parsed_data if "label" in item
+            ],
+            "sizes": [item["font_size"] for item in parsed_data if "label" in item],
+            "text": [item["label"] for item in parsed_data if "label" in item],
+            "styles": style_config["label"],  # Add styles here for consistency
+        },
+    }
+
+    # Step 2: Validate essential data
+    if len(extracted["quote"]["dims"]) < 1 or len(extracted["quote"]["sizes"]) < 1:
+        raise ValueError("Insufficient quote data extracted")
+
+    # Step 3: Process author and label configurations
+    config = process_metadata(author, label, extracted, style_config)
+
+    # Step 4: Complete background configuration
+    background = dict(style_config["background"])  # Don't mutate shared styles
+    background["till"] = (
+        config["author"]["dims"][-1]["y2"]
+        if (
+            background["mode"] == "unified"
+            and author != "none"
+            and config["author"]["dims"]
+        )
+        else extracted["quote"]["dims"][-1]["y2"]  # Fallback to quote's Y2
+    )
+
+    # Step 5: Create final params object for process_media
+    params = {
+        "quote_data": extracted["quote"],
+        "new_quote_text": quote,
+        "author_data": config["author"],
+        "new_author_text": author,
+        "label_data": config["label"],
+        "new_label_text": label,
+        "background": background,
+    }
+
+    return params
+
+
 def process_metadata(author, label, extracted, style_config):
     """Process author and label metadata based on availability"""
     config = {
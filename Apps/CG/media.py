@@ -1,11 +1,12 @@
 from utils import (
-    render_background,
-    render_text_element,
     render_fonts,
     calc_width_proportions,
     format_text_by_width,
+    fit_font_size,
 )
 from image import *
+from layout import build_layout_plan
+from presets import PRESET_VIDEO_OPTIONS, render_image_presets, render_video_presets
 from video import insert_quote_on_video
 
 
@@ -20,6 +21,12 @@ def process_media(
     new_label_text=None,
     background=None,
     overlay_img_path=None,  # Optional for images
+    video_options=None,  # Extra insert_quote_on_video kwargs (e.g. compositing)
+    output_path=None,  # Defaults to result.mp4 / result.jpg
+    line_breaking="greedy",  # "greedy" or "optimal" quote line fitting
+    auto_fit=False,  # Pick the largest quote font size that fits every quote box
+    max_quote_lines=None,  # With auto_fit, also try re-flowing into up to this many lines
+    presets=None,  # Preset names or {name: (w, h)}; renders every size in one pass
 ):
     """Process image or video by adding text elements."""
 
@@ -44,7 +51,9 @@ def process_media(
     )
 
     # Format text elements
-    formatted_quote = format_text_by_width(new_quote_text, quote_widths, quote_font)
+    formatted_quote = format_text_by_width(
+        new_quote_text, quote_widths, quote_font, mode=line_breaking
+    )
     formatted_author = (
         format_text_by_width(new_author_text, author_widths, author_font)
         if author_data and author_widths
@@ -63,6 +72,26 @@ def process_media(
     quote_style = quote_data.get("styles", {}).get("mode", "normal")
     quote_color = quote_data.get("styles", {}).get("color", (255, 255, 255))
 
+    # Shrink or grow the quote so the new text fits the original boxes
+    if auto_fit:
+        fit = fit_font_size(
+            new_quote_text,
+            quote_dims,
+            quote_widths,
+            style=quote_style,
+            max_size=quote_font.size * 2,
+            mode=line_breaking,
+            max_lines=max_quote_lines,
+        )
+        if fit:
+            quote_font, formatted_quote, quote_dims = (
+                fit["font"],
+                fit["formatted"],
+                fit["boxes"],
+            )
+        else:
+            print("⚠️ Warning: Quote doesn't fit its boxes even at the minimum size.")
+
     author_dims = author_data["dims"] if author_data else None
     author_style = author_data.get("mode", "normal") if author_data else None
     author_color = author_data.get("color", (255, 255, 255)) if author_data else None
@@ -78,6 +107,46 @@ def process_media(
     bg_type = background.get("type", None) if background else None
     padding_ratio = background.get("padding_ratio", 0.2) if background else None
 
+    # Compute the layout once; the renderers only draw from it
+    layout_plan = build_layout_plan(
+        formatted_quote,
+        quote_dims,
+        quote_font,
+        quote_style,
+        quote_color,
+        formatted_author,
+        author_dims,
+        author_font,
+        author_style,
+        author_color,
+        formatted_label,
+        label_dims,
+        label_font,
+        label_style,
+        label_color,
+        use_background,
+        till=till,
+        bg_color=bg_color,
+        bg_type=bg_type,
+        padding_ratio=padding_ratio,
+    )
+
+    # Multi-resolution output from one decode and one layout
+    if presets:
+        if is_video:
+            options = {
+                key: value
+                for key, value in (video_options or {}).items()
+                if key in PRESET_VIDEO_OPTIONS
+            }
+            return render_video_presets(
+                media_path, layout_plan, presets, output_path or "result.mp4", **options
+            )
+        _, overlay_img = load_images(media_path, overlay_img_path, copy_base=False)
+        return render_image_presets(
+            overlay_img, layout_plan, presets, output_path or "result.jpg"
+        )
+
     # Process Media
     if is_video:
         # In the video processing block of process_media():
@@ -103,11 +172,14 @@ def process_media(
             bg_color=bg_color,
             bg_type=bg_type,
             padding_ratio=padding_ratio,
+            output_path=output_path or "result.mp4",
+            layout_plan=layout_plan,
+            **(video_options or {}),
         )
         return result_video
     else:
         # Load images
-        _, overlay_img = load_images(media_path, overlay_img_path)
+        _, overlay_img = load_images(media_path, overlay_img_path, copy_base=False)
         # Add text to images
         result_img = add_text_to_image(
             overlay_img,
@@ -131,7 +203,8 @@ def process_media(
             bg_color=bg_color,
             bg_type=bg_type,
             padding_ratio=padding_ratio,
+            layout_plan=layout_plan,
         )
-        result_path = "result.jpg"
+        result_path = output_path or "result.jpg"
         result_img.save(result_path)
         return result_path
@@ -0,0 +1,119 @@
+import queue
+import threading
+import numpy as np
+from ffmpeg_utils import FFmpegFrameReader, FFmpegFrameWriter
+
+_DONE = object()  # Sentinel passed downstream once a stage has no more frames
+
+
+class PipelineError(RuntimeError):
+    """Raised when any stage of the frame pipeline fails."""
+
+
+class _Stages:
+    """Bounded queues between stages, plus a shared failure flag."""
+
+    def __init__(self, size, buffers):
+        width, height = size
+        self.failed = threading.Event()
+        self.errors = []
+        # Frame buffers are allocated once and cycle decode -> composite -> encode
+        self.free = queue.Queue()
+        for _ in range(buffers):
+            self.free.put(np.empty((height, width, 3), dtype=np.uint8))
+        self.decoded = queue.Queue(maxsize=buffers)
+        self.composited = queue.Queue(maxsize=buffers)
+
+    def put(self, target, item):
+        # Poll so a stage blocked on a full queue notices a failure downstream
+        while True:
+            try:
+                return target.put(item, timeout=0.1)
+            except queue.Full:
+                if self.failed.is_set():
+                    raise PipelineError("Another stage failed")
+
+    def get(self, source):
+        while True:
+            try:
+                return source.get(timeout=0.1)
+            except queue.Empty:
+                if self.failed.is_set():
+                    raise PipelineError("Another stage failed")
+
+    def run(self, name, stage):
+        def target():
+            try:
+                stage()
+            except PipelineError:
+                pass
+            except Exception as e:
+                self.errors.append(f"{name}: {e}")
+                self.failed.set()
+
+        thread = threading.Thread(target=target, name=f"pipeline-{name}", daemon=True)
+        thread.start()
+        return thread
+
+
+def render_pipelined(
+    video_path, size, fps, alpha_at, fader, output_path, buffers=8, encoder_options=None
+):
+    """
+    Render with decode, composite and encode overlapping in separate threads.
+
+    Decoding and encoding run in ffmpeg subprocesses, so their threads spend
+    most of their time in pipe I/O with the GIL released while the overlay
+    is blended. Frames flow through a fixed pool of preallocated buffers.
+
+    Args:
+        video_path: Background video
+        size: (width, height) of the decoded frames
+        fps: Source frame rate (frame index / fps gives the timestamp)
+        alpha_at: Callable mapping a timestamp to the overlay's fade alpha
+        fader: FadeCache used to blend the overlay in place
+        output_path: Video-only output file
+        buffers: Frames in flight (also the queue bound)
+        encoder_options: FFmpegFrameWriter settings (codec, preset, crf, threads)
+    """
+    stages = _Stages(size, buffers)
+
+    def decode():
+        with FFmpegFrameReader(video_path) as reader:
+            index = 0
+            while True:
+                buffer = stages.get(stages.free)
+                if not reader.read_into(buffer):
+                    break
+                stages.put(stages.decoded, (index, buffer))
+                index += 1
+        stages.put(stages.decoded, _DONE)
+
+    def composite():
+        while (item := stages.get(stages.decoded)) is not _DONE:
+            index, buffer = item
+            alpha = alpha_at(index / fps)
+            if alpha > 0:
+                fader.blend_into(buffer, alpha)
+            stages.put(stages.composited, buffer)
+        stages.put(stages.composited, _DONE)
+
+    def encode():
+        with FFmpegFrameWriter(
+            output_path, size, fps, **(encoder_options or {})
+        ) as writer:
+            while (buffer := stages.get(stages.composited)) is not _DONE:
+                writer.write(buffer)
+                stages.free.put(buffer)  # Hand the buffer back to the decoder
+
+    threads = [
+        stages.run("decode", decode),
+        stages.run("composite", composite),
+        stages.run("encode", encode),
+    ]
+    for thread in threads:
+        thread.join()
+
+    if stages.errors:
+        raise PipelineError("; ".join(stages.errors))
+    return output_path
@@ -0,0 +1,141 @@
+import os
+import tempfile
+import cv2
+from PIL import Image, ImageDraw, ImageOps
+from moviepy import VideoFileClip
+from compositor import FadeCache, rasterize_overlay
+from ffmpeg_utils import FFmpegFrameWriter, mux_audio
+from layout import draw_layout_plan, scale_layout_plan
+from video import DEFAULT_AUDIO_SOURCE, fade_alpha, safe_clip_handling
+
+# Output sizes as (width, height)
+PRESETS = {
+    "story": (1080, 1920),
+    "square": (1080, 1080),
+    "preview": (720, 1280),  # 720p vertical preview
+}
+
+# insert_quote_on_video options that also apply to preset rendering
+PRESET_VIDEO_OPTIONS = {
+    "start_time",
+    "end_time",
+    "fade_in_duration",
+    "fade_out_duration",
+    "audio_path",
+    "encoder_options",
+}
+
+
+def resolve_presets(presets):
+    """Accept preset names and/or {name: (width, height)} and return a dict."""
+    if isinstance(presets, dict):
+        return dict(presets)
+    return {name: PRESETS[name] for name in presets}
+
+
+def preset_path(output_path, name):
+    """result.mp4 -> result-story.mp4"""
+    stem, ext = os.path.splitext(output_path)
+    return f"{stem}-{name}{ext}"
+
+
+def cover_transform(src_size, dst_size):
+    """
+    Scale that covers dst_size with src_size, and the centered crop offset.
+
+    Returns:
+        (scale, (offset_x, offset_y)) in destination pixels
+    """
+    (src_w, src_h), (dst_w, dst_h) = src_size, dst_size
+    scale = max(dst_w / src_w, dst_h / src_h)
+    offset = (round((src_w * scale - dst_w) / 2), round((src_h * scale - dst_h) / 2))
+    return scale, offset
+
+
+def cover_resize(frame, dst_size, scale, offset):
+    """Crop the source region that survives the cover fit, then resize once."""
+    dst_w, dst_h = dst_size
+    x1, y1 = round(offset[0] / scale), round(offset[1] / scale)
+    x2, y2 = x1 + round(dst_w / scale), y1 + round(dst_h / scale)
+    crop = frame[y1:y2, x1:x2]
+    interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR
+    return cv2.resize(crop, (dst_w, dst_h), interpolation=interpolation)
+
+
+def render_image_presets(image, layout_plan, presets, output_path="result.jpg"):
+    """Draw the text on one decoded image for every preset size."""
+    outputs = {}
+    for name, size in resolve_presets(presets).items():
+        scale, offset = cover_transform(image.size, size)
+        resized = ImageOps.fit(image, size, method=Image.LANCZOS)
+        draw_layout_plan(
+            ImageDraw.Draw(resized, "RGBA"), scale_layout_plan(layout_plan, scale, offset)
+        )
+        outputs[name] = preset_path(output_path, name)
+        resized.save(outputs[name])
+    return outputs
+
+
+def render_video_presets(
+    video_path,
+    layout_plan,
+    presets,
+    output_path="result.mp4",
+    start_time=0.5,
+    end_time=3.5,
+    fade_in_duration=1.5,
+    fade_out_duration=1.5,
+    audio_path="",
+    encoder_options=None,  # FFmpegFrameWriter settings shared by every preset
+):
+    """
+    Decode the background video once and encode every preset from it.
+
+    Each preset gets its own overlay, rasterized once at its resolution,
+    and its own ffmpeg encoder fed from the same decoded frames.
+    """
+    presets = resolve_presets(presets)
+    clip = VideoFileClip(video_path, audio=False)
+
+    with safe_clip_handling(clip):
+        if end_time is None:
+            end_time = clip.duration
+        timing = (start_time, end_time, fade_in_duration, fade_out_duration)
+
+        with tempfile.TemporaryDirectory() as workdir:
+            targets = []
+            try:
+                for name, size in presets.items():
+                    scale, offset = cover_transform(clip.size, size)
+                    plan = scale_layout_plan(layout_plan, scale, offset)
+                    overlay = rasterize_overlay(
+                        size, lambda draw, plan=plan: draw_layout_plan(draw, plan)
+                    )
+                    silent_path = os.path.join(workdir, f"{name}.mp4")
+                    writer = FFmpegFrameWriter(
+                        silent_path, size, clip.fps, **(encoder_options or {})
+                    )
+                    targets.append(
+                        (name, size, scale, offset, FadeCache(overlay), writer, silent_path)
+                    )
+
+                for t, frame in clip.iter_frames(with_times=True, dtype="uint8"):
+                    alpha = fade_alpha(t, *timing)
+                    for _, size, scale, offset, fader, writer, _ in targets:
+                        resized = cover_resize(frame, size, scale, offset)
+                        writer.write(fader.blend_into(resized, alpha))
+            finally:
+                for target in targets:
+                    target[5].close()
+
+            outputs = {}
+            for name, *_, silent_path in targets:
+                outputs[name] = preset_path(output_path, name)
+                mux_audio(
+                    silent_path,
+                    audio_path or DEFAULT_AUDIO_SOURCE,
+                    outputs[name],
+                    clip.duration,
+                )
+
+    return outputs
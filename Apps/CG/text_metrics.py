@@ -0,0 +1,56 @@
+from collections import OrderedDict
+
+MAX_CACHED_LINES = 4096
+MAX_MEASURERS = 128
+
+
+class TextMeasurer:
+    """Caches word, space and full-line widths for a single font."""
+
+    def __init__(self, font):
+        self.font = font
+        self.space = font.getlength(" ")
+        self._words = {}
+        self._lines = {}
+
+    def word(self, word):
+        """Advance width of a single word."""
+        width = self._words.get(word)
+        if width is None:
+            width = self._words[word] = self.font.getlength(word)
+        return width
+
+    def words(self, words):
+        """Approximate width of words joined by single spaces (no kerning across words)."""
+        if not words:
+            return 0.0
+        return sum(self.word(w) for w in words) + self.space * (len(words) - 1)
+
+    def bbox(self, text):
+        """Exact, kerning-correct (left, top, right, bottom) of a rendered line."""
+        box = self._lines.get(text)
+        if box is None:
+            if len(self._lines) >= MAX_CACHED_LINES:
+                self._lines.clear()
+            box = self._lines[text] = self.font.getbbox(text)
+        return box
+
+    def line(self, text):
+        """Exact width of a rendered line (right edge of its bbox)."""
+        return self.bbox(text)[2]
+
+
+_measurers = OrderedDict()
+
+
+def measurer_for(font):
+    """Shared TextMeasurer for a font, keyed by (font path, size) and LRU-bounded."""
+    key = (getattr(font, "path", None) or id(font), getattr(font, "size", None))
+    measurer = _measurers.get(key)
+    if measurer is None:
+        measurer = _measurers[key] = TextMeasurer(font)
+        if len(_measurers) > MAX_MEASURERS:
+            _measurers.popitem(last=False)
+    else:
+        _measurers.move_to_end(key)
+    return measurer
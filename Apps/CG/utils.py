@@ -1,55 +1,122 @@
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw
+from text_metrics import measurer_for
+from fonts import DEFAULT_FACE, get_font
 
+FIT_REFERENCE_SIZE = 100  # Font size whose measurements auto-fit probes scale
 
-def render_fonts(font_sizes, author_size, label_size):
-    font_path = "arial.ttf"
+
+def render_fonts(font_sizes, author_size, label_size, face=DEFAULT_FACE):
     avg_font_size = int(sum(font_sizes) / len(font_sizes))
 
-    # Initialize fonts
-    quote_font = ImageFont.truetype(font_path, avg_font_size)
-    author_font = (
-        ImageFont.truetype(font_path, int(author_size)) if author_size else None
-    )
-    label_font = ImageFont.truetype(font_path, int(label_size)) if label_size else None
+    # Initialize fonts (loaded once per process by the font registry)
+    quote_font = get_font(avg_font_size, face)
+    author_font = get_font(int(author_size), face) if author_size else None
+    label_font = get_font(int(label_size), face) if label_size else None
 
     return quote_font, author_font, label_font
 
 
 def calc_width_proportions(font, text_lines):
     """Calculate proportional widths of text lines relative to combined text."""
+    measurer = measurer_for(font)
     combined_text = " ".join(text_lines)
-    total_width = font.getbbox(combined_text)[2]
+    total_width = measurer.line(combined_text)
+
+    return [round(measurer.line(line) / total_width * 100) for line in text_lines]
 
-    return [round(font.getbbox(line)[2] / total_width * 100) for line in text_lines]
 
+def fit_lines_optimally(words, target_widths, measurer, total_width):
+    """
+    Split words into len(target_widths) lines minimizing the total squared
+    deviation from the target width percentages (Knuth-Plass style DP).
 
-def format_text_by_width(text, target_widths, font):
+    Only trailing lines may be left empty, and only once all words are used.
+    """
+    num_words, num_lines = len(words), len(target_widths)
+
+    # prefix[k] = summed advance of the first k words
+    prefix = [0.0]
+    for word in words:
+        prefix.append(prefix[-1] + measurer.word(word))
+
+    def percent(i, j):
+        if i == j:
+            return 0.0
+        width = prefix[j] - prefix[i] + measurer.space * (j - i - 1)
+        return width / total_width * 100
+
+    inf = float("inf")
+    # cost[l][j]: best cost of laying out the first j words on l lines
+    cost = [[inf] * (num_words + 1) for _ in range(num_lines + 1)]
+    split = [[0] * (num_words + 1) for _ in range(num_lines + 1)]
+    cost[0][0] = 0.0
+
+    for line in range(num_lines):
+        target = target_widths[line]
+        for i in range(num_words + 1):
+            if cost[line][i] == inf:
+                continue
+            # An empty line is only allowed once every word is placed
+            first_end = i if i == num_words else i + 1
+            for j in range(first_end, num_words + 1):
+                candidate = cost[line][i] + (percent(i, j) - target) ** 2
+                if candidate < cost[line + 1][j]:
+                    cost[line + 1][j] = candidate
+                    split[line + 1][j] = i
+
+    # Walk the split points back from the last line
+    lines, end = [], num_words
+    for line in range(num_lines, 0, -1):
+        start = split[line][end]
+        lines.append(" ".join(words[start:end]))
+        end = start
+    return lines[::-1]
+
+
+def format_text_by_width(text, target_widths, font, mode="greedy"):
     """
     Format text into multiple lines based on specified width proportions.
 
+    Line widths are accumulated from cached word advances, so breaking runs
+    in linear time; each finished line is re-measured once, kerning-correct.
+
     Args:
         text: Text to format
         target_widths: List of target width percentages for each line
         font: Font object for text measurement
+        mode: "greedy" fills lines one by one, "optimal" fits all lines at once
 
     Returns:
         Dictionary with formatted lines and their width percentages
     """
+    measurer = measurer_for(font)
     words = text.split()
     total_words = len(words)
-    total_width = font.getbbox(text)[2]
+    total_width = measurer.line(text) or 1
     result = {}
     word_idx = 0
 
+    if mode == "optimal":
+        lines = fit_lines_optimally(words, target_widths, measurer, total_width)
+        for i, line in enumerate(lines):
+            result[f"line-{i+1}"] = line
+            result[f"occupied-{i+1}"] = (
+                round(measurer.line(line) / total_width * 100) if line else 0
+            )
+        return result
+
     for i, target_percent in enumerate(target_widths):
         line_num = i + 1
         current_line = []
+        line_width = 0.0
 
         # Add words until we reach target width
         while word_idx < total_words:
+            candidate_width = line_width + measurer.word(words[word_idx])
+            if current_line:
+                candidate_width += measurer.space
             current_line.append(words[word_idx])
-            test_line = " ".join(current_line)
-            current_percent = round((font.getbbox(test_line)[2] / total_width) * 100)
+            current_percent = round(candidate_width / total_width * 100)
 
             # Remove word if we exceeded target (unless it's the only word or last word)
             if (
@@ -60,13 +127,17 @@ def format_text_by_width(text, target_widths, font):
                 current_line.pop()
                 break
 
+            line_width = candidate_width
             word_idx += 1
 
             if word_idx >= total_words:
                 break
 
-        result[f"line-{line_num}"] = " ".join(current_line)
-        result[f"occupied-{line_num}"] = current_percent
+        line = " ".join(current_line)
+        result[f"line-{line_num}"] = line
+        result[f"occupied-{line_num}"] = (
+            round(measurer.line(line) / total_width * 100) if line else 0
+        )
 
         # Fill remaining lines with empty strings if we've used all words
         if word_idx >= total_words and i < len(target_widths) - 1:
@@ -78,6 +149,120 @@ def format_text_by_width(text, target_widths, font):
     return result
 
 
+def apply_text_style(text, style):
+    """Apply the configured case transformation to a line of text."""
+    if style == "upper":
+        return text.upper()
+    if style == "capitalize":
+        return text.capitalize()
+    return text
+
+
+def split_box_rows(boxes, count):
+    """Divide the union of boxes into count equal-height rows."""
+    x1 = min(box["x1"] for box in boxes)
+    y1 = min(box["y1"] for box in boxes)
+    x2 = max(box["x2"] for box in boxes)
+    y2 = max(box["y2"] for box in boxes)
+    row_height = (y2 - y1) / count
+    return [
+        {
+            "x1": x1,
+            "y1": round(y1 + row * row_height),
+            "x2": x2,
+            "y2": round(y1 + (row + 1) * row_height),
+        }
+        for row in range(count)
+    ]
+
+
+def lines_fit_boxes(formatted, boxes, measurer, style, total_words, scale=1.0):
+    """Check that every word was placed and each line's bbox fits its box."""
+    lines = [
+        apply_text_style(formatted.get(f"line-{i+1}", ""), style)
+        for i in range(len(boxes))
+    ]
+    if sum(len(line.split()) for line in lines) < total_words:
+        return False  # Greedy breaking dropped overflowing words
+
+    for line, box in zip(lines, boxes):
+        if not line:
+            continue
+        left, top, right, bottom = measurer.bbox(line)
+        if (right - left) * scale > box["x2"] - box["x1"]:
+            return False
+        if (bottom - top) * scale > box["y2"] - box["y1"]:
+            return False
+    return True
+
+
+def fit_font_size(
+    text,
+    boxes,
+    target_widths,
+    style="normal",
+    face=DEFAULT_FACE,
+    min_size=8,
+    max_size=200,
+    mode="greedy",
+    max_lines=None,
+):
+    """
+    Binary-search the largest font size at which text fits every box.
+
+    Line breaks depend on width proportions, which don't change with size,
+    so text is broken once at a reference size and each probe just scales
+    those cached measurements. The winner is confirmed with the real font.
+    With max_lines, re-flowing into more (equal-height) rows is tried too.
+
+    Returns:
+        Dict with size, font, formatted and boxes, or None if nothing fits
+    """
+    candidates = [(boxes, target_widths)]
+    for count in range(len(boxes) + 1, (max_lines or 0) + 1):
+        candidates.append((split_box_rows(boxes, count), [round(100 / count)] * count))
+
+    total_words = len(text.split())
+    reference = measurer_for(get_font(FIT_REFERENCE_SIZE, face))
+
+    best = None
+    for line_boxes, widths in candidates:
+        formatted = format_text_by_width(text, widths, reference.font, mode)
+
+        def fits(size):
+            return lines_fit_boxes(
+                formatted,
+                line_boxes,
+                reference,
+                style,
+                total_words,
+                scale=size / FIT_REFERENCE_SIZE,
+            )
+
+        low, high, size = min_size, max_size, None
+        while low <= high:
+            mid = (low + high) // 2
+            if fits(mid):
+                size, low = mid, mid + 1
+            else:
+                high = mid - 1
+
+        # Hinting isn't perfectly linear, so step down until the real font fits
+        while size is not None and size >= min_size:
+            font = get_font(size, face)
+            exact = format_text_by_width(text, widths, font, mode)
+            if lines_fit_boxes(exact, line_boxes, measurer_for(font), style, total_words):
+                break
+            size -= 1
+        else:
+            continue  # Nothing fits with this line count
+
+        if best is None or size > best["size"]:
+            best = {"size": size, "font": font, "formatted": exact, "boxes": line_boxes}
+
+    return best
+
+
 def get_text_metrics(draw, text, font, padding_ratio):
     """Calculate text dimensions and related values."""
     bbox = draw.textbbox((0, 0), text, font=font)
@@ -97,142 +282,3 @@ def calc_bg_rect(x1, y1, text_width, text_height, padding):
         x1 + text_width + padding,
         y1 + text_height + padding,
     ]
-
-
-def render_background(
-    draw,
-    use_background,
-    unified_background,
-    bg_color,
-    till=None,
-    text=None,
-    font=None,
-    padding_ratio=None,
-    radius=None,
-    bg_rect=None,
-    quote_dims=None,
-    bg_type=None,
-):
-    if use_background and not unified_background:
-        if bg_type != "regular":
-            draw.rounded_rectangle(bg_rect, fill=bg_color, radius=radius)
-        elif bg_type == "regular":
-            draw.rectangle(bg_rect, fill=bg_color)
-    if use_background and unified_background:
-        # Combine all quote lines for unified background
-        all_lines = "\n".join([text[f"line-{i+1}"] for i in range(len(quote_dims))])
-
-        _, _, padding, radius = get_text_metrics(draw, all_lines, font, padding_ratio)
-        # Background covering all quote lines
-        till = till if till is not None else quote_dims[-1]["y2"]
-        bg_rect = [
-            quote_dims[0]["x1"] - padding,
-            quote_dims[0]["y1"] - padding,
-            quote_dims[-1]["x2"] + padding,
-            till + padding,
-        ]
-
-        if bg_type != "regular":
-            draw.rounded_rectangle(bg_rect, fill=bg_color, radius=radius)
-        elif bg_type == "regular":
-            draw.rectangle(bg_rect, fill=bg_color)
-        return None
-
-
-def render_text(
-    draw,
-    lines,
-    font,
-    boxes,
-    color,
-    style,
-    padding_ratio,
-    use_background,
-    unified_background,
-    bg_color,
-    bg_type,
-):
-    """Render text with appropriate styling and optional background."""
-    for text, box in zip(lines, boxes):
-        # Apply text style transformations
-        if style == "upper":
-            text = text.upper()
-        elif style == "capitalize":
-            text = text.capitalize()
-
-        # Calculate text dimensions
-        text_width, text_height, padding, radius = get_text_metrics(
-            draw, text, font, padding_ratio
-        )
-
-        # Center text in bounding box
-        x = box["x1"] + ((box["x2"] - box["x1"]) - text_width) // 2
-        y = box["y1"] + ((box["y2"] - box["y1"]) - text_height) // 2
-
-        # Compute the bg rect
-        bg_rect = calc_bg_rect(x, y, text_width, text_height, padding)
-
-        # Draw individual text background if needed
-        if use_background and not unified_background:
-            render_background(
-                draw=draw,
-                use_background=use_background,
-                unified_background=unified_background,
-                bg_color=bg_color,
-                bg_rect=bg_rect,
-                radius=radius,
-                bg_type=bg_type,
-            )
-
-        # Draw the text
-        draw.text((x, y), text, font=font, fill=color)
-
-
-def render_text_element(
-    draw,
-    quote_data,
-    quote_dims,
-    quote_font,
-    quote_color,
-    quote_style,
-    author_data=None,
-    author_dims=None,
-    author_font=None,
-    author_color=None,
-    author_style=None,
-    label_data=None,
-    label_dims=None,
-    label_font=None,
-    label_color=None,
-    label_style=None,
-    padding_ratio=0.5,
-    use_background=False,
-    unified_background=False,
-    bg_color=(0, 0, 0, 180),
-    bg_type=None,
-):
-    text_elements = [
-        (quote_data, quote_dims, quote_font, quote_color, quote_style),
-        (author_data, author_dims, author_font, author_color, author_style),
-        (label_data, label_dims, label_font, label_color, label_style),
-    ]
-
-    for text_data, dims, font, color, style in text_elements:
-        if text_data and dims:
-            lines = [
-                text_data.get(f"line-{i+1}", "")  # Use .get() with default
-                for i in range(len(dims))
-            ]
-            render_text(
-                draw,
-                lines,
-                font,
-                dims,
-                color,
-                style,
-                padding_ratio,
-                use_background,
-                unified_background,
-                bg_color,
-                bg_type,
-            )
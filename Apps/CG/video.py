@@ -1,7 +1,6 @@
 from moviepy import (
     VideoFileClip,
     VideoClip,
-    concatenate_audioclips,
     TextClip,
     CompositeVideoClip,
     ColorClip,
@@ -9,10 +8,33 @@ from moviepy import (
     AudioFileClip,
 )
 from PIL import Image, ImageDraw, ImageFont
-from utils import render_background, render_text_element
+from layout import build_layout_plan, draw_layout_plan
+from compositor import FadeCache, rasterize_overlay
+from pipeline import render_pipelined
+from ffmpeg_utils import (
+    probe_splice_params,
+    splice_encoder_args,
+    keyframe_times,
+    cut_stream_copy,
+    concat_segments,
+    mux_audio,
+    probe_duration,
+    FFmpegFrameWriter,
+    FrameRing,
+)
 import os
+import tempfile
 import numpy as np
 import contextlib
+from concurrent.futures import ProcessPoolExecutor
+
+DEFAULT_AUDIO_SOURCE = "sample/sample-vid-6.mp4"
+
+# Source codecs whose untouched segments can be stream-copied and spliced
+# back together with a re-encoded window (source codec -> encoder)
+# (hevc isn't spliced: copied hevc segments keep their parameter sets only in
+# hvcC, so they'd decode against the window's)
+SPLICE_ENCODERS = {"h264": "libx264"}
 
 
 # Helper function to safely close MoviePy clips
@@ -29,6 +51,181 @@ def safe_clip_handling(*clips):
                     print(f"Warning: Error closing clip: {e}")
 
 
+def fade_alpha(t, start_time, end_time, fade_in_duration, fade_out_duration):
+    """Calculate text visibility at time t based on fade in/out."""
+    # Before start time or after end time
+    if t < start_time or t > end_time:
+        return 0.0
+    # During fade in
+    if t < start_time + fade_in_duration:
+        return min(1, (t - start_time) / fade_in_duration)
+    # During fade out
+    if t > end_time - fade_out_duration:
+        return max(0, (end_time - t) / fade_out_duration)
+    return 1.0
+
+
+def render_segments(
+    clip, video_path, make_frame, start_time, end_time, audio_source, output_path
+):
+    """
+    Re-encode only the keyframe-aligned window where text is visible.
+
+    The head and tail of the clip are stream-copied without decoding and
+    joined back with the re-encoded window, then the audio is muxed on. The
+    window is encoded with the source's profile, level, reference frames,
+    pix_fmt and timebase, frame by frame for exactly the frames it spans.
+    Returns None when the source can't be spliced this way.
+    """
+    params = probe_splice_params(video_path)
+    encoder = params and SPLICE_ENCODERS.get(params["codec"])
+    if encoder is None:
+        return None
+
+    # Widen the text window outwards to the nearest keyframes
+    keyframes = keyframe_times(video_path)
+    window_start = max((k for k in keyframes if k <= start_time), default=0.0)
+    window_end = min((k for k in keyframes if k >= end_time), default=clip.duration)
+
+    # Cut half a frame inside the copied segments: -ss/-t are applied in
+    # microseconds, so a cut exactly on a keyframe could round to the wrong
+    # side of it and repeat or drop a whole GOP
+    margin = 0.5 / clip.fps
+
+    with tempfile.TemporaryDirectory() as workdir:
+        segments = []
+        if window_start > 0:
+            head_path = os.path.join(workdir, "head.mp4")
+            segments.append(
+                cut_stream_copy(video_path, 0, window_start - margin, head_path)
+            )
+
+        # Drive the window by frame count; int(duration * fps) can drop its last frame
+        window_path = os.path.join(workdir, "window.mp4")
+        window_frames = round((window_end - window_start) * clip.fps)
+        with FFmpegFrameWriter(
+            window_path,
+            clip.size,
+            clip.fps,
+            codec=encoder,
+            pix_fmt=params["pix_fmt"],
+            extra_args=splice_encoder_args(params),
+        ) as writer:
+            for index in range(window_frames):
+                writer.write(make_frame(window_start + index / clip.fps))
+        segments.append(window_path)
+
+        if window_end < clip.duration:
+            tail_path = os.path.join(workdir, "tail.mp4")
+            segments.append(
+                cut_stream_copy(
+                    video_path, window_end + margin, clip.duration, tail_path
+                )
+            )
+
+        joined_path = concat_segments(segments, os.path.join(workdir, "joined.mp4"))
+        mux_audio(joined_path, audio_source, output_path, clip.duration)
+
+    return output_path
+
+
+def encode_direct(clip, alpha_at, blend, output_path, encoder_options=None):
+    """
+    Pipe frames straight into an ffmpeg encoder at the source frame rate.
+
+    Frames that need the overlay are copied into one of a few preallocated
+    buffers and blended there; frames without text are written untouched.
+    """
+    ring = FrameRing(clip.size)
+    with FFmpegFrameWriter(
+        output_path, clip.size, clip.fps, **(encoder_options or {})
+    ) as writer:
+        for t, frame in clip.iter_frames(with_times=True, dtype="uint8"):
+            alpha = alpha_at(t)
+            if alpha > 0:
+                buffer = ring.next()
+                np.copyto(buffer, frame)
+                frame = blend(buffer, alpha)
+            writer.write(frame)
+    return output_path
+
+
+def render_chunk(
+    video_path, overlay, timing, first, last, fps, output_path, threads=None
+):
+    """
+    Decode, overlay and encode frames [first, last) of the video (runs in a worker).
+
+    Frames are addressed by index (t = index / fps) so every chunk writes
+    exactly last - first frames and the joined video loses none at the seams.
+    """
+    clip = VideoFileClip(video_path, audio=False)
+    fader = FadeCache(overlay)
+
+    with safe_clip_handling(clip), FFmpegFrameWriter(
+        output_path, clip.size, fps, threads=threads
+    ) as writer:
+        for index in range(first, last):
+            t = index / fps
+            frame = clip.get_frame(t)
+            alpha = fade_alpha(t, *timing)
+            if alpha > 0:
+                if not frame.flags.writeable:
+                    frame = frame.copy()
+                frame = fader.blend_into(frame, alpha)
+            writer.write(frame)
+    return output_path
+
+
+def render_parallel(
+    video_path,
+    overlay,
+    timing,
+    duration,
+    audio_source,
+    output_path,
+    workers=None,
+    fps=24,
+    encoder_threads=None,  # libx264 threads per chunk (defaults to cores / workers)
+):
+    """
+    Render the video as frame-aligned chunks across a process pool.
+
+    Workers only receive the pre-rendered overlay (plain NumPy arrays), never
+    PIL fonts. Chunks share encoder settings, so they are concatenated
+    without re-encoding and the audio is muxed once at the end. Each chunk's
+    encoder gets its share of the cores instead of threading across all of them.
+    """
+    workers = workers or os.cpu_count() or 1
+    encoder_threads = encoder_threads or max(1, (os.cpu_count() or 1) // workers)
+    total_frames = int(duration * fps)
+    bounds = np.linspace(0, total_frames, workers + 1).astype(int)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(
+                    render_chunk,
+                    video_path,
+                    overlay,
+                    timing,
+                    int(first),
+                    int(last),
+                    fps,
+                    os.path.join(workdir, f"chunk-{idx:03d}.mp4"),
+                    encoder_threads,
+                )
+                for idx, (first, last) in enumerate(zip(bounds[:-1], bounds[1:]))
+                if last > first
+            ]
+            chunks = [future.result() for future in futures]
+
+        joined_path = concat_segments(chunks, os.path.join(workdir, "joined.mp4"))
+        mux_audio(joined_path, audio_source, output_path, duration)
+
+    return output_path
+
+
 def process_video(
     video_path,
     formatted_quote,
@@ -94,156 +291,162 @@ def insert_quote_on_video(
     bg_type=None,
     padding_ratio=0.5,
     audio_path="",
+    compositing="overlay",  # "overlay" fades a pre-rendered layer, "pil" redraws every frame
+    render_mode="full",  # "full", "segments" (text window only), "parallel" or "pipeline"
+    workers=None,  # Process count for render_mode="parallel" (defaults to CPU count)
+    output_path="result.mp4",
+    layout_plan=None,  # Precomputed LayoutPlan; built from the arguments above if None
+    encoder="moviepy",  # "moviepy" or "ffmpeg" (frames piped straight to ffmpeg)
+    encoder_options=None,  # ffmpeg encoder settings: codec, preset, crf, threads
 ):
-    if use_background == "unified":
-        unified_background = True
-    elif use_background == "highlight_box":
-        unified_background = False
-    else:
-        unified_background = False
-        use_background = False
-
-    def insert_text_on_frame(frame, alpha=1.0):
-        image = Image.fromarray(frame)
-        draw = ImageDraw.Draw(image, "RGBA")  # Add RGBA mode here
-
-        # Create adjusted text color with alpha
-        adjusted_quote_color = list(quote_color)
-        if len(adjusted_quote_color) == 4:  # If quote_color has alpha channel
-            adjusted_quote_color[3] = int(adjusted_quote_color[3] * alpha)
-        else:
-            adjusted_quote_color = (*adjusted_quote_color, int(255 * alpha))
-
-        # Same for author color if provided
-        adjusted_author_color = None
-        if author_color:
-            adjusted_author_color = list(author_color)
-            if len(adjusted_author_color) == 4:
-                adjusted_author_color[3] = int(adjusted_author_color[3] * alpha)
-            else:
-                adjusted_author_color = (*adjusted_author_color, int(255 * alpha))
-
-        # Same for label color if provided
-        adjusted_label_color = None
-        if label_color:
-            adjusted_label_color = list(label_color)
-            if len(adjusted_label_color) == 4:
-                adjusted_label_color[3] = int(adjusted_label_color[3] * alpha)
-            else:
-                adjusted_label_color = (*adjusted_label_color, int(255 * alpha))
-
-        # Handle background rendering with adjusted alpha
-        if use_background and unified_background:
-            render_background(
-                draw=draw,
-                use_background=use_background,
-                unified_background=unified_background,
-                bg_color=bg_color,
-                padding_ratio=padding_ratio,
-                font=quote_font,
-                text=quote_data,
-                quote_dims=quote_dims,
-                till=till,
-                bg_type=bg_type,
-            )
-
-        # Render text with adjusted alpha
-        render_text_element(
-            draw,
+    # Measure and position everything once; frames only draw from the plan
+    if layout_plan is None:
+        layout_plan = build_layout_plan(
             quote_data,
             quote_dims,
             quote_font,
-            tuple(adjusted_quote_color),
             quote_style,
+            quote_color,
             author_data,
             author_dims,
             author_font,
-            tuple(adjusted_author_color),
             author_style,
+            author_color,
             label_data,
             label_dims,
             label_font,
-            tuple(adjusted_label_color),
             label_style,
-            padding_ratio,
+            label_color,
             use_background,
-            unified_background,
-            bg_color,
-            bg_type,
+            till=till,
+            bg_color=bg_color,
+            bg_type=bg_type,
+            padding_ratio=padding_ratio,
         )
 
+    def draw_text_layer(draw, alpha=1.0):
+        draw_layout_plan(draw, layout_plan, alpha)
+
+    def insert_text_on_frame(frame, alpha=1.0):
+        image = Image.fromarray(frame)
+        draw = ImageDraw.Draw(image, "RGBA")  # Add RGBA mode here
+        draw_text_layer(draw, alpha)
         return np.array(image)
 
     clip = None
-    audio_clip = None
     modified_clip = None
 
     try:
-        clip = VideoFileClip(video_path)
+        # Audio is muxed from its source by ffmpeg, so the clip never decodes any
+        clip = VideoFileClip(video_path, audio=False)
 
         # Set default end_time if not provided
         if end_time is None:
             end_time = clip.duration
 
+        # Rasterize the text layer once at full opacity instead of redrawing it
+        overlay = fader = None
+        if compositing == "overlay" or render_mode in ("parallel", "pipeline"):
+            overlay = rasterize_overlay(clip.size, draw_text_layer)
+            fader = FadeCache(overlay)
+
         def make_frame(t):
             frame = clip.get_frame(t)
-
-            # Calculate alpha based on fade in/out
-            alpha = 1.0
-
-            # Before start time or after end time
-            if t < start_time or t > end_time:
-                alpha = 0.0
-            # During fade in
-            elif t < start_time + fade_in_duration:
-                alpha = min(1, (t - start_time) / fade_in_duration)
-            # During fade out
-            elif t > end_time - fade_out_duration:
-                alpha = max(0, (end_time - t) / fade_out_duration)
+            alpha = fade_alpha(
+                t, start_time, end_time, fade_in_duration, fade_out_duration
+            )
 
             # Only process frame if there's some visibility
-            if alpha > 0:
-                return insert_text_on_frame(frame, alpha)
-            else:
+            if alpha <= 0:
                 return frame
+            if fader is not None:
+                # Decoders may hand out read-only buffers; copy only then
+                if not frame.flags.writeable:
+                    frame = frame.copy()
+                return fader.blend_into(frame, alpha)
+            return insert_text_on_frame(frame, alpha)
+
+        def alpha_at(t):
+            return fade_alpha(
+                t, start_time, end_time, fade_in_duration, fade_out_duration
+            )
+
+        if render_mode == "pipeline":
+            with tempfile.TemporaryDirectory() as workdir:
+                silent_path = render_pipelined(
+                    video_path,
+                    clip.size,
+                    clip.fps,
+                    alpha_at,
+                    fader,
+                    os.path.join(workdir, "video.mp4"),
+                    encoder_options=encoder_options,
+                )
+                mux_audio(
+                    silent_path,
+                    audio_path or DEFAULT_AUDIO_SOURCE,
+                    output_path,
+                    clip.duration,
+                )
+            return output_path
+
+        if render_mode == "parallel":
+            return render_parallel(
+                video_path,
+                overlay,
+                (start_time, end_time, fade_in_duration, fade_out_duration),
+                clip.duration,
+                audio_path or DEFAULT_AUDIO_SOURCE,
+                output_path,
+                workers,
+                fps=clip.fps,
+            )
+
+        if render_mode == "segments":
+            result = render_segments(
+                clip,
+                video_path,
+                make_frame,
+                start_time,
+                end_time,
+                audio_path or DEFAULT_AUDIO_SOURCE,
+                output_path,
+            )
+            if result:
+                return result
+            print("Source codec can't be spliced, falling back to a full render.")
+
+        if encoder == "ffmpeg":
+            blend = fader.blend_into if fader is not None else insert_text_on_frame
+            with tempfile.TemporaryDirectory() as workdir:
+                silent_path = encode_direct(
+                    clip,
+                    alpha_at,
+                    blend,
+                    os.path.join(workdir, "video.mp4"),
+                    encoder_options,
+                )
+                mux_audio(
+                    silent_path,
+                    audio_path or DEFAULT_AUDIO_SOURCE,
+                    output_path,
+                    clip.duration,
+                )
+            return output_path
 
         modified_clip = VideoClip(make_frame, duration=clip.duration)
 
-        # Audio processing
-        with safe_clip_handling() as _:
-            try:
-                if audio_path != "":
-                    # Load external audio file
-                    audio_clip = AudioFileClip(audio_path)
-                else:
-                    # extract audio from video
-                    sample_vid = VideoFileClip("sample/sample-vid-6.mp4")
-                    audio_clip = sample_vid.audio
-                if audio_clip is None:
-                    # Don't add audio if audio_clip is None
-                    print("No audio found in the video.")
-                    return None
-                if audio_clip.duration < clip.duration:
-                    loop_count = int(clip.duration // audio_clip.duration) + 1
-                    audio_clips = [audio_clip] * loop_count
-
-                    # Properly handle concatenated audio clips
-                    concatenated_audio = concatenate_audioclips(audio_clips)
-                    with safe_clip_handling(concatenated_audio) as _:
-                        concatenated_audio = concatenated_audio.with_duration(
-                            clip.duration
-                        )
-                        modified_clip = modified_clip.with_audio(concatenated_audio)
-                else:
-                    audio_clip = audio_clip.with_duration(clip.duration)
-                    modified_clip = modified_clip.with_audio(audio_clip)
-
-                print("Audio added successfully and synced with video duration.")
-            except Exception as e:
-                print(f"Error adding audio: {str(e)}")
-
-        output_path = "result.mp4"
-        modified_clip.write_videofile(output_path, fps=24)
+        # Encode the video alone, then loop/trim the audio onto it by stream copy
+        with tempfile.TemporaryDirectory() as workdir:
+            silent_path = os.path.join(workdir, "video.mp4")
+            modified_clip.write_videofile(silent_path, fps=24, audio=False)
+            mux_audio(
+                silent_path,
+                audio_path or DEFAULT_AUDIO_SOURCE,
+                output_path,
+                clip.duration,
+            )
+        print("Audio added successfully and synced with video duration.")
 
         return output_path
 
@@ -252,7 +455,7 @@ def insert_quote_on_video(
         return None
     finally:
         # Ensure all resources are properly closed
-        for resource in [clip, audio_clip, modified_clip]:
+        for resource in [clip, modified_clip]:
             if resource is not None:
                 try:
                     resource.close()
@@ -260,17 +463,33 @@ def insert_quote_on_video(
                     print(f"Warning: Error closing resource: {e}")
 
 
-def forge_video(catch):
+def forge_video(catch, encoder="moviepy", encoder_options=None, fps=24):
     clip = None
     audio = None
 
+    if encoder == "ffmpeg":
+        # One still frame, written fps * duration times from the same buffer
+        image = Image.open(catch) if isinstance(catch, str) else Image.fromarray(catch)
+        frame = np.ascontiguousarray(np.asarray(image.convert("RGB")))
+        audio_path = "sample/sample-audio.mp3"
+        duration = probe_duration(audio_path)
+        with tempfile.TemporaryDirectory() as workdir:
+            silent_path = os.path.join(workdir, "video.mp4")
+            with FFmpegFrameWriter(
+                silent_path, image.size, fps, **(encoder_options or {})
+            ) as writer:
+                for _ in range(int(duration * fps)):
+                    writer.write(frame)
+            mux_audio(silent_path, audio_path, "result.mp4", duration)
+        return "result.mp4"
+
     try:
         clip = ImageClip(catch)
         audio = AudioFileClip("sample/sample-audio.mp3")
         clip = clip.with_duration(audio.duration)
         clip = clip.with_audio(audio)
         clip = CompositeVideoClip([clip])
-        clip.write_videofile("result.mp4", fps=24)
+        clip.write_videofile("result.mp4", fps=fps)
         return "result.mp4"
     finally:
         # Properly close all resources
@@ -20,6 +20,47 @@ def smooth_scroll(driver, pixels):
     time.sleep(0.25 + abs(pixels) / 500)
 
 
+# ========== DOM Snapshot ============ #
+
+POST_SNAPSHOT_JS = """
+const post = arguments[0];
+const withText = arguments[2];
+let bar = arguments[1];
+if (!bar) {
+    const button = post.querySelector("section div[data-visualcompletion='ignore-dynamic']");
+    bar = button ? button.closest("section") : null;
+}
+const box = (el) => {
+    const r = el.getBoundingClientRect();
+    return {top: r.top, bottom: r.bottom, left: r.left, right: r.right,
+            height: r.height, width: r.width};
+};
+const more = [...post.querySelectorAll("span")].find((s) => s.textContent === "more");
+return {
+    spans: withText
+        ? [...post.querySelectorAll('span[dir="auto"]')]
+              .map((s) => s.innerText.trim())
+              .filter((t) => t)
+        : [],
+    action_bar: bar,
+    bar_rect: bar ? box(bar) : null,
+    post_rect: box(post),
+    viewport_height: window.innerHeight,
+    more_button: more || null,
+};
+"""
+
+
+def snapshot_post(driver, post, action_bar=None, with_text=True):
+    """
+    Read everything needed about a post in one execute_script round trip.
+
+    Returns a dict with span texts, the action bar element and its rect, the
+    post rect, the viewport height and the "more" button (or None).
+    """
+    return driver.execute_script(POST_SNAPSHOT_JS, post, action_bar, with_text)
+
+
 # ========== Naviagate to Target ============ #
 
 
@@ -92,39 +133,42 @@ def close_instagram_modal(driver, wait, timeout=6):
 
 
 # ========== Act on Post ============ #
-def act_on_post(driver, post, ai_decision):
-    """Act on post with human-like micro behaviors."""
+def act_on_post(driver, post, ai_decision, snapshot=None):
+    """Act on post with human-like micro behaviors (snapshot: from snapshot_post)."""
     try:
         if ai_decision == "Yes":
             print("AI decided: YES → Showing interest")
 
             # --- Step 1: Scroll to "... more" if available ---
-            try:
-                more_button = post.find_element(By.XPATH, ".//span[text()='more']")
-
-                # Smooth scroll to bring the 'more' button into view
-                # more_button_bottom = driver.execute_script(
-                #     "arguments[0].getBoundingClientRect().bottom", more_button
-                # )
-                # smooth_scroll(driver, more_button_bottom)
-                driver.execute_script(
-                    "arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});",
-                    more_button,
-                )
-                time.sleep(random.uniform(0.8, 1.5))  # pause like a human noticing it
-
-                # Click "... more"
-                driver.execute_script("arguments[0].click();", more_button)
-                print("Expanded post description.")
-                time.sleep(random.uniform(0.5, 1.2))  # pause after expansion
-            except:
+            if snapshot is None:
+                snapshot = snapshot_post(driver, post, with_text=False)
+            more_button = snapshot["more_button"]
+            if more_button is not None:
+                try:
+                    # Smooth scroll to bring the 'more' button into view
+                    # more_button_bottom = driver.execute_script(
+                    #     "arguments[0].getBoundingClientRect().bottom", more_button
+                    # )
+                    # smooth_scroll(driver, more_button_bottom)
+                    driver.execute_script(
+                        "arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});",
+                        more_button,
+                    )
+                    time.sleep(random.uniform(0.8, 1.5))  # pause like a human noticing it
+
+                    # Click "... more"
+                    driver.execute_script("arguments[0].click();", more_button)
+                    print("Expanded post description.")
+                    time.sleep(random.uniform(0.5, 1.2))  # pause after expansion
+                except Exception as e:
+                    print("Couldn't expand post description:", e)
+            else:
                 print("No 'more' button found for this post.")
 
             # --- Step 2: Simulate reading caption ---
             try:
-                # Capture all visible spans (expanded text)
-                spans = post.find_elements(By.CSS_SELECTOR, 'span[dir="auto"]')
-                text = " ".join([s.text for s in spans if s.text.strip()])
+                # Capture all visible spans (expanded text) in one round trip
+                text = " ".join(snapshot_post(driver, post)["spans"])
                 text_len = len(text)
 
                 if text_len > 0:
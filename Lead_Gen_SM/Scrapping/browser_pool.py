@@ -0,0 +1,276 @@
+from libraries import (
+    os,
+    time,
+    signal,
+    atexit,
+    queue,
+    threading,
+    contextmanager,
+    WebDriverWait,
+    WDE,
+)
+from initiation import (
+    STARTUP_TIMEOUT,
+    get_free_port,
+    profile_data_dir,
+    launch_chrome,
+    wait_for_devtools,
+    attach_driver,
+    signal_group,
+    stop_chrome,
+)
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+PID_FILE = "browser_pool.pid"  # Written into each profile's data dir while it runs
+
+
+########## Process Inspection (/proc) ##########
+
+
+def process_group_rss(pgid):
+    """Total resident memory (bytes) of every process in a process group."""
+    total = 0
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                stat = f.read()
+        except OSError:
+            continue  # Process exited while we were scanning
+        # Fields after "(comm)": state, ppid, pgrp, ... rss is the 22nd
+        fields = stat[stat.rfind(")") + 2 :].split()
+        if int(fields[2]) == pgid:
+            total += int(fields[21]) * PAGE_SIZE
+    return total
+
+
+def reap_orphans(profile):
+    """Kill a Chrome group left running for this profile by an earlier crashed run."""
+    pid_path = os.path.join(profile_data_dir(profile), PID_FILE)
+    try:
+        with open(pid_path) as f:
+            pgid = int(f.read().strip())
+    except (OSError, ValueError):
+        return
+
+    # Only kill it if that pid is still Chrome on this profile (pids get reused).
+    # argv entries are NUL-separated; compare whole entries so "Profile 1"
+    # doesn't match "Profile 10"
+    try:
+        with open(f"/proc/{pgid}/cmdline", "rb") as f:
+            argv = f.read().decode(errors="replace").split("\0")
+    except OSError:
+        argv = []
+    if f"--user-data-dir={profile_data_dir(profile)}" in argv:
+        print(f"⚠️ Reaping orphaned Chrome (pid {pgid}) for {profile}")
+        signal_group(pgid, signal.SIGKILL)
+
+    try:
+        os.remove(pid_path)
+    except OSError:
+        pass
+
+
+########## Browser Session ##########
+
+
+class BrowserSession:
+    """One warm, profile-bound Chrome instance with Selenium attached."""
+
+    def __init__(self, profile, timeout=STARTUP_TIMEOUT, capture_network=False):
+        self.profile = profile
+        self.port = get_free_port()
+        self.proc = launch_chrome(profile, self.port)
+        try:
+            wait_for_devtools(self.port, self.proc, timeout)
+            self.driver = attach_driver(self.port, capture_network)
+        except Exception:
+            stop_chrome(self.proc)
+            raise
+
+        self.wait = WebDriverWait(self.driver, 10)
+        self.capture_network = capture_network
+        self.pages = 0
+        self.next_visit = 0.0  # Earliest time.monotonic() for the next paced visit
+        self.closed = False
+        self.baseline_rss = process_group_rss(self.proc.pid)
+
+        with open(os.path.join(profile_data_dir(profile), PID_FILE), "w") as f:
+            f.write(str(self.proc.pid))
+
+    def get(self, url):
+        """Navigate, counting the page towards the recycle limit."""
+        self.pages += 1
+        self.driver.get(url)
+
+    def rss_growth(self):
+        """Bytes of memory gained by this Chrome group since it was launched."""
+        return process_group_rss(self.proc.pid) - self.baseline_rss
+
+    def is_healthy(self):
+        """Chrome is still running and the driver answers a round trip."""
+        if self.proc.poll() is not None:
+            return False
+        try:
+            self.driver.execute_script("return 1;")
+            return True
+        except WDE:
+            return False
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            # Attached via debugger_address, so this only ends the chromedriver side
+            self.driver.quit()
+        except Exception as e:
+            print(f"Warning: Error quitting driver for {self.profile}: {e}")
+        stop_chrome(self.proc)
+        try:
+            os.remove(os.path.join(profile_data_dir(self.profile), PID_FILE))
+        except OSError:
+            pass
+
+
+########## Browser Pool ##########
+
+
+class BrowserPool:
+    """
+    Keep one warm Chrome per profile and hand them out with checkout/checkin.
+
+    Sessions are health-checked on checkout and recycled (relaunched) once
+    they have loaded max_pages pages or grown by more than max_rss_growth_mb.
+    A relaunch is retried with backoff; if it still fails, the error is
+    raised so callers know the pool has shrunk.
+    Chrome runs in its own process group, so closing a session takes its
+    helper processes with it; groups orphaned by a crashed run are reaped
+    on startup.
+    """
+
+    def __init__(
+        self,
+        profiles,
+        max_pages=200,
+        max_rss_growth_mb=1024,
+        timeout=STARTUP_TIMEOUT,
+        capture_network=False,  # Buffer DevTools network events (see network_capture)
+        launch_attempts=3,  # Tries per (re)launch, with 1s, 2s, ... between them
+    ):
+        self.size = len(profiles)
+        self.max_pages = max_pages
+        self.max_rss_growth = max_rss_growth_mb * 1024 * 1024
+        self.timeout = timeout
+        self.capture_network = capture_network
+        self.launch_attempts = launch_attempts
+        self._idle = queue.Queue()
+        self._sessions = []
+        self._lock = threading.Lock()
+        self._closed = False
+        atexit.register(self.close)
+
+        try:
+            for profile in profiles:
+                reap_orphans(profile)
+                self._add(self._launch(profile))
+        except Exception:
+            self.close()
+            raise
+
+    def _add(self, session):
+        with self._lock:
+            self._sessions.append(session)
+        self._idle.put(session)
+
+    def _launch(self, profile):
+        """Launch a session for a profile, retrying with backoff before giving up."""
+        for attempt in range(1, self.launch_attempts + 1):
+            try:
+                return BrowserSession(profile, self.timeout, self.capture_network)
+            except Exception as e:
+                if attempt == self.launch_attempts:
+                    raise
+                delay = 2 ** (attempt - 1)
+                print(f"⚠️ Launching {profile} failed ({e}), retrying in {delay}s")
+                time.sleep(delay)
+
+    def _recycle(self, session, reason):
+        """Replace a session with a freshly launched one on the same profile."""
+        print(f"♻️ Recycling {session.profile}: {reason}")
+        self._discard(session)
+        try:
+            fresh = self._launch(session.profile)
+        except Exception as e:
+            raise RuntimeError(
+                f"Could not relaunch {session.profile}; "
+                f"{len(self._sessions)} session(s) left in the pool"
+            ) from e
+        with self._lock:
+            self._sessions.append(fresh)
+        return fresh
+
+    def checkout(self, timeout=None):
+        """
+        Take an idle, healthy session; blocks until one is free.
+
+        Raises RuntimeError if the pool is closed or has no sessions left,
+        or if an unhealthy session can't be relaunched.
+        """
+        if self._closed:
+            raise RuntimeError("Browser pool is closed")
+        if not self._sessions:
+            raise RuntimeError("Browser pool has no sessions left")
+        session = self._idle.get(timeout=timeout)
+        if not session.is_healthy():
+            session = self._recycle(session, "failed health check")
+        return session
+
+    def checkin(self, session):
+        """
+        Return a session, recycling it first if it's past its page or memory limit.
+
+        Raises RuntimeError if the recycled session can't be relaunched.
+        """
+        if self._closed:
+            session.close()  # Already shut down by close(); this is a no-op then
+            return
+        if session.pages >= self.max_pages:
+            session = self._recycle(session, f"{session.pages} pages loaded")
+        elif session.rss_growth() > self.max_rss_growth:
+            growth_mb = session.rss_growth() / (1024 * 1024)
+            session = self._recycle(session, f"memory grew by {growth_mb:.0f} MB")
+        self._idle.put(session)
+
+    def _discard(self, session):
+        with self._lock:
+            if session in self._sessions:
+                self._sessions.remove(session)
+        session.close()
+
+    @contextmanager
+    def session(self, timeout=None):
+        """with pool.session() as browser: ... (checked back in afterwards)."""
+        browser = self.checkout(timeout)
+        try:
+            yield browser
+        finally:
+            self.checkin(browser)
+
+    def close(self):
+        """Shut down every session, including ones still checked out."""
+        if self._closed:
+            return
+        self._closed = True
+        with self._lock:
+            sessions, self._sessions = self._sessions, []
+        for session in sessions:
+            session.close()
+        atexit.unregister(self.close)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -1,44 +1,44 @@
-from libraries import WebDriverWait, EC, By, time, random, Keys
+from libraries import random
 
 from navigation import navigation
 from actions import target_profile, close_instagram_modal
-from initiation import initiate_driver
+from initiation import wait_for_page
+from browser_pool import BrowserPool
 from humanism import PostHandler
 
+MAIN_PROFILE = "Profile 1"  # Insta browsing
+SIDE_PROFILES = ["Profile 2"]  # Post info scrapping (add profiles to collect in parallel)
+TARGET = "https://instagram.com/"
+EXTRACTION = "dom"  # "network" parses post data from captured API responses instead
 
-########## Seting up Chrome for Insta Browsing ##########
-def main_driver():
-    profile = "Profile 1"
-    target = "https://instagram.com/"
-    driver = initiate_driver(profile, target)
-    return driver
 
+########## Seting up Chrome Pools ##########
+# Every Chrome is launched warm up front and shut down (with its helper
+# processes) when the pools close, even if browsing fails halfway. Side
+# sessions are checked out per batch of links, so they get recycled mid-run
+main_pool = BrowserPool([MAIN_PROFILE])
+side_pool = BrowserPool(SIDE_PROFILES, capture_network=EXTRACTION == "network")
 
-########## Seting up Chrome for Post Info Scrapping ##########
-def auxiliary_driver():
-    profile = "Profile 2"
-    side_driver = initiate_driver(profile)
-    return side_driver
+try:
+    with main_pool.session() as main:
+        driver_main = main.driver
+        main.get(TARGET)
+        wait_for_page(driver_main)
 
+        ### Constants & Variables
+        wait = main.wait
+        erratic_pause = random.uniform(2, 5)
+        roll_dice = random.randint(1, 6)
 
-########## Use ThreadPoolExecutor ##########
+        ############# Human Touch #############
 
-
-driver_main = main_driver()
-side_driver = auxiliary_driver()
-
-
-### Constants & Variables
-wait = WebDriverWait(driver_main, 10)
-side_driver_wait = WebDriverWait(side_driver, 10)
-erratic_pause = random.uniform(2, 5)
-roll_dice = random.randint(1, 6)
-
-############# Human Touch #############
-
-### Note that It includes Smooth scrolling, home feeds browsing, erratic pauses, reels watching, etc.
-post_handler = PostHandler(driver_main, wait, side_driver, side_driver_wait)
-post_handler.browse_feed()
+        ### Note that It includes Smooth scrolling, home feeds browsing, erratic pauses, reels watching, etc.
+        post_handler = PostHandler(driver_main, wait, side_pool, extraction=EXTRACTION)
+        post_handler.browse_feed()
+finally:
+    # Clean shutdown: drivers detached, Chrome process groups terminated
+    main_pool.close()
+    side_pool.close()
 
 ############# Scraping with Selenium #############
 # navigation("search", wait, erratic_pause)
@@ -102,7 +102,3 @@ post_handler.browse_feed()
 #     except Exception as e:
 #         print(f"Error with post/reel from row-{idx+1}: {e}")
 
-
-# Clean shutdown
-# driver.quit()  # Selenium releases the browser
-# proc.terminate()  # Kill Chrome process you launched
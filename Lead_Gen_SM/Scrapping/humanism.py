@@ -1,33 +1,31 @@
 from libraries import time, random, re, By, SERE, WDE, EC
 from ai_support import recieve_post_info, decide_interest
-from actions import act_on_post, smooth_scroll
+from actions import act_on_post, smooth_scroll, snapshot_post
 from post_info import collect_links
 
 
 class PostHandler:
-    def __init__(self, driver_main, wait, side_driver, side_driver_wait):
+    def __init__(self, driver_main, wait, side_pool, extraction="dom"):
         self.driver_main = driver_main
         self.wait = wait
-        self.side_driver = side_driver
-        self.side_driver_wait = side_driver_wait
+        # BrowserPool of auxiliary profiles; post links are spread across all of them
+        self.side_pool = side_pool
+        self.extraction = extraction  # "dom" or "network" (see network_capture)
 
     # -------------------------------
     # 🔹 Helpers
     # -------------------------------
-    def _get_rect(self, element):
-        """Return bounding rect (dict with top/bottom/left/right/height/width)."""
-        return self.driver_main.execute_script(
-            "return arguments[0].getBoundingClientRect();", element
-        )
+    def _snapshot(self, post, action_butns=None, with_text=False):
+        """Rects, viewport height, action bar and "more" button in one round trip."""
+        return snapshot_post(self.driver_main, post, action_butns, with_text)
 
     def _align_post_in_view(self, target, action_butns):
         """Human-like alignment: overshoot down, then correct up, maybe overshoot again."""
-        viewport_height = self.driver_main.execute_script("return window.innerHeight;")
-
         # --- Phase 1: Overshoot down (bigger flicks) ---
         while True:
-            target_bottom = self._get_rect(action_butns)["bottom"]
-            if target_bottom > viewport_height:
+            snapshot = self._snapshot(target, action_butns)
+            viewport_height = snapshot["viewport_height"]
+            if snapshot["bar_rect"]["bottom"] > viewport_height:
                 delta = random.uniform(
                     random.uniform(50, 150), random.uniform(200, 350)
                 )
@@ -38,7 +36,9 @@ class PostHandler:
 
         # --- Phase 2: Correction up (smaller nudges) ---
         while True:
-            bar_rect = self._get_rect(action_butns)
+            snapshot = self._snapshot(target, action_butns)
+            viewport_height = snapshot["viewport_height"]
+            bar_rect = snapshot["bar_rect"]
             bar_top, bar_bottom = bar_rect["top"], bar_rect["bottom"]
 
             # Stop if action bar is within viewport bounds
@@ -69,19 +69,21 @@ class PostHandler:
         except Exception:
             print("No spans loaded inside post, skipping...")
 
-        post_data = self._extract_post_info(post)
+        snapshot = self._snapshot(post, with_text=True)
+        post_data = self._extract_post_info(post, snapshot)
         if post_data:
             info_str = recieve_post_info(post_data)  # JSON string
             ai_decision = decide_interest(info_str)
             print("AI decision:", ai_decision)
-            act_on_post(self.driver_main, post, ai_decision)
+            act_on_post(self.driver_main, post, ai_decision, snapshot)
         else:
             print("Empty post data, skipping...")
 
-    def _extract_post_info(self, post):
+    def _extract_post_info(self, post, snapshot=None):
         """Extract visible text from spans inside a post."""
-        spans = post.find_elements(By.CSS_SELECTOR, 'span[dir="auto"]')
-        return [span.text.strip() for span in spans if span.text.strip()]
+        if snapshot is None:
+            snapshot = self._snapshot(post, with_text=True)
+        return snapshot["spans"]
 
     def _scroll_until_found(self, find_func, retries=5, delay_range=(1, 3)):
         """Keep scrolling until Selenium can find the element(s) via find_func."""
@@ -102,19 +104,13 @@ class PostHandler:
     def _process_post(self, post):
         """Bring post into view, wait for content, decide, and act."""
         try:
-            target, action_butns = post, None
+            target = post
 
             # Locate the first section containing action buttons
-            try:
-                button = post.find_element(
-                    By.CSS_SELECTOR,
-                    "section div[data-visualcompletion='ignore-dynamic']",
-                )
-                action_butns = self.driver_main.execute_script(
-                    "return arguments[0].closest('section');", button
-                )
+            action_butns = self._snapshot(post)["action_bar"]
+            if action_butns:
                 print("✅ Found actions bar.")
-            except:
+            else:
                 print("❌ No actions bar found. Using fallback = whole post.")
 
             if action_butns:
@@ -124,11 +120,9 @@ class PostHandler:
             else:
                 # fallback behavior: wait until bottom in view
                 while True:
-                    target_bottom = self._get_rect(target)["bottom"]
+                    snapshot = self._snapshot(target)
                     print("Fallback used")
-                    if target_bottom <= self.driver_main.execute_script(
-                        "return window.innerHeight;"
-                    ):
+                    if snapshot["post_rect"]["bottom"] <= snapshot["viewport_height"]:
                         self._stop_scroll(post)
                         break
                     smooth_scroll(self.driver_main, random.uniform(30, 120))
@@ -160,8 +154,8 @@ class PostHandler:
                     if clean_url not in seen:  # keep first occurrence only
                         post_links.append(clean_url)
                         seen.add(clean_url)
-                        
-        collect_links(post_links, self.side_driver, self.side_driver_wait)
+
+        return collect_links(post_links, self.side_pool, mode=self.extraction)
         # post = self._scroll_until_found(
         #     lambda: self.driver_main.find_element(By.XPATH, "//article")
         # )
@@ -9,8 +9,14 @@ from libraries import (
     WebDriverWait,
     EC,
     socket,
+    json,
+    urllib,
+    signal,
 )
 
+CHROME_PATH = "/usr/bin/google-chrome"
+STARTUP_TIMEOUT = 15  # Seconds to wait for DevTools before giving up on Chrome
+
 ########## Find a Free Port ##########
 
 def get_free_port():
@@ -25,35 +31,126 @@ def get_free_port():
 ########## Seting up Chrome with remote debugging ##########
 
 
-def initiate_driver(profile, target=None):
-    chrome_path = "/usr/bin/google-chrome"
-    user_data_dir = os.path.expanduser(f"~/selenium_learning/{profile}")
+def profile_data_dir(profile):
+    """User data directory backing a Chrome profile."""
+    return os.path.expanduser(f"~/selenium_learning/{profile}")
 
-    # Pick a free port dynamically
-    port = get_free_port()
 
-    # Launch Chrome with unique profile + port
-    proc = subprocess.Popen(
+def launch_chrome(profile, port):
+    """
+    Start Chrome for a profile with remote debugging on the given port.
+
+    Chrome leads its own session (process group), so stop_chrome can take
+    down its renderer and GPU helpers along with the browser process.
+    """
+    return subprocess.Popen(
         [
-            chrome_path,
+            CHROME_PATH,
             f"--remote-debugging-port={port}",
-            f"--user-data-dir={user_data_dir}",
+            f"--user-data-dir={profile_data_dir(profile)}",
             f"--profile-directory={profile}",
-        ]
+        ],
+        start_new_session=True,
     )
 
-    time.sleep(5)  # give Chrome time to start
 
-    # Connect Selenium to THAT Chrome instance
+def wait_for_devtools(port, proc, timeout=STARTUP_TIMEOUT):
+    """
+    Poll the DevTools /json/version endpoint until Chrome answers.
+
+    Backs off from 50ms up to 1s between attempts. Raises TimeoutError if
+    Chrome isn't ready in time, or RuntimeError if the process exits first.
+    """
+    url = f"http://127.0.0.1:{port}/json/version"
+    deadline = time.monotonic() + timeout
+    delay = 0.05
+    while True:
+        if proc.poll() is not None:
+            raise RuntimeError(
+                f"Chrome exited with code {proc.returncode} before DevTools came up"
+            )
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                return json.load(response)
+        except (urllib.error.URLError, ConnectionError, TimeoutError, ValueError):
+            pass
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError(
+                f"Chrome DevTools not ready on port {port} after {timeout}s"
+            )
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, 1.0)
+
+
+def signal_group(pgid, sig):
+    """Send a signal to a whole process group, ignoring groups that are already gone."""
+    try:
+        os.killpg(pgid, sig)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def stop_chrome(proc, grace=5):
+    """Terminate Chrome and its helpers, killing them if they don't exit in time."""
+    signal_group(proc.pid, signal.SIGTERM)
+    try:
+        proc.wait(timeout=grace)
+    except subprocess.TimeoutExpired:
+        signal_group(proc.pid, signal.SIGKILL)
+        proc.wait()
+    # Helpers that outlived the browser process
+    signal_group(proc.pid, signal.SIGKILL)
+
+
+def attach_driver(port, capture_network=False):
+    """
+    Connect Selenium to the Chrome instance listening on the given port.
+
+    With capture_network, DevTools network events are buffered in the
+    performance log so post data can be read from API responses.
+    """
     options = Options()
     options.debugger_address = f"127.0.0.1:{port}"
-    driver = webdriver.Chrome(options=options)
+    if capture_network:
+        options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    return webdriver.Chrome(options=options)
+
+
+def initiate_driver(
+    profile, target=None, timeout=STARTUP_TIMEOUT, capture_network=False
+):
+    # Pick a free port dynamically
+    port = get_free_port()
+
+    # Launch Chrome with unique profile + port
+    proc = launch_chrome(profile, port)
+
+    # Attach as soon as DevTools answers instead of sleeping a fixed time
+    try:
+        wait_for_devtools(port, proc, timeout)
+        # Connect Selenium to THAT Chrome instance
+        driver = attach_driver(port, capture_network)
+    except Exception:
+        stop_chrome(proc)
+        raise
 
     if target:
-        driver.get(target)
-        WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.TAG_NAME, "body"))
-        )
-        time.sleep(random.uniform(2, 5))
+        open_target(driver, target)
 
     return driver
+
+
+def open_target(driver, target):
+    """Load a page, wait for its body, then pause like a person would."""
+    driver.get(target)
+    wait_for_page(driver)
+
+
+def wait_for_page(driver):
+    """Wait for the current page's body, then pause like a person would."""
+    WebDriverWait(driver, 10).until(
+        EC.presence_of_element_located((By.TAG_NAME, "body"))
+    )
+    time.sleep(random.uniform(2, 5))
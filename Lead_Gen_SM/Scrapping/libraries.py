@@ -3,10 +3,18 @@ import os
 import time
 import json
 import random
+import base64
 import subprocess
 import re
 from concurrent.futures import ThreadPoolExecutor
 import socket
+import signal
+import atexit
+import queue
+import threading
+from contextlib import contextmanager
+import urllib.request
+import urllib.error
 
 # ================== Selenium ==================
 from selenium import webdriver
@@ -17,6 +25,7 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import StaleElementReferenceException as SERE
 from selenium.common.exceptions import WebDriverException as WDE
+from selenium.common.exceptions import TimeoutException
 
 # ================== AI Integration ==================
 from google import genai
@@ -0,0 +1,138 @@
+from libraries import json, re, base64, WDE
+
+# Responses that carry post (media) data when a post page loads
+POST_API_URL = re.compile(r"/graphql/query|/api/graphql|/api/v1/media/")
+SHORTCODE_URL = re.compile(r"/(?:p|reel)/([^/?#]+)")
+
+
+def shortcode_of(link):
+    """https://www.instagram.com/p/ABC123/ -> "ABC123" """
+    match = SHORTCODE_URL.search(link)
+    return match.group(1) if match else None
+
+
+def is_post_api(response):
+    mime = response.get("mimeType", "")
+    return bool(POST_API_URL.search(response.get("url", ""))) and (
+        "json" in mime or "javascript" in mime
+    )
+
+
+def parse_body(text):
+    """Decode an API body; streamed GraphQL responses hold one JSON object per line."""
+    text = text.removeprefix("for (;;);")
+    try:
+        return [json.loads(text)]
+    except ValueError:
+        pass
+    payloads = []
+    for line in text.splitlines():
+        try:
+            payloads.append(json.loads(line))
+        except ValueError:
+            continue
+    return payloads
+
+
+class NetworkCapture:
+    """
+    Read API responses a driver has already received, via its performance log.
+
+    The driver must be attached with capture_network=True. Bodies are only
+    fetched (Network.getResponseBody) for post API responses that finished
+    loading, so nothing else crosses the WebDriver connection.
+    """
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.pending = set()  # requestIds of post API responses still loading
+
+    def reset(self):
+        """Drop everything captured so far (e.g. before opening the next post)."""
+        self.driver.get_log("performance")
+        self.pending.clear()
+
+    def payloads(self):
+        """Yield decoded JSON payloads received since the last call."""
+        for entry in self.driver.get_log("performance"):
+            message = json.loads(entry["message"])["message"]
+            method, params = message.get("method"), message.get("params", {})
+
+            if method == "Network.responseReceived" and is_post_api(params["response"]):
+                self.pending.add(params["requestId"])
+            elif method == "Network.loadingFinished":
+                if params["requestId"] in self.pending:
+                    self.pending.discard(params["requestId"])
+                    yield from self._body(params["requestId"])
+
+    def _body(self, request_id):
+        try:
+            body = self.driver.execute_cdp_cmd(
+                "Network.getResponseBody", {"requestId": request_id}
+            )
+        except WDE:
+            return []  # Body already evicted from Chrome's buffer
+        text = body.get("body", "")
+        if body.get("base64Encoded"):
+            text = base64.b64decode(text).decode("utf-8", errors="replace")
+        return parse_body(text)
+
+
+########## Post JSON Parsing ##########
+
+
+def find_media(payload, shortcode):
+    """Depth-first search for the media object whose code/shortcode matches."""
+    stack = [payload]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            if shortcode in (node.get("code"), node.get("shortcode")):
+                return node
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+    return None
+
+
+def _edge_count(media, *keys):
+    for key in keys:
+        edge = media.get(key)
+        if isinstance(edge, dict) and "count" in edge:
+            return edge["count"]
+    return None
+
+
+def parse_media(media):
+    """
+    Pull caption, author and counts out of a media object.
+
+    Handles both the v1 API shape (caption.text, user, like_count) and the
+    older GraphQL shape (edge_media_to_caption, owner, edge_* counts).
+    """
+    caption = media.get("caption")
+    if isinstance(caption, dict):
+        caption = caption.get("text")
+    if caption is None:
+        edges = media.get("edge_media_to_caption", {}).get("edges", [])
+        caption = edges[0]["node"]["text"] if edges else None
+
+    owner = media.get("user") or media.get("owner") or {}
+
+    likes = media.get("like_count")
+    if likes is None:
+        likes = _edge_count(media, "edge_media_preview_like", "edge_liked_by")
+    comments = media.get("comment_count")
+    if comments is None:
+        comments = _edge_count(
+            media, "edge_media_to_parent_comment", "edge_media_to_comment"
+        )
+    views = media.get("play_count") or media.get("video_view_count")
+
+    return {
+        "caption": caption,
+        "author": owner.get("username"),
+        "likes": likes,
+        "comments": comments,
+        "views": views,
+    }
@@ -1,12 +1,133 @@
-from libraries import EC, By, time, random, re
+from libraries import (
+    EC,
+    By,
+    time,
+    random,
+    re,
+    queue,
+    ThreadPoolExecutor,
+    WDE,
+    TimeoutException,
+    WebDriverWait,
+)
 
+CAPTURE_TIMEOUT = 3  # Seconds to wait for a post payload before reading the DOM
+from network_capture import NetworkCapture, shortcode_of, find_media, parse_media
 
-def collect_links(links, side_driver, side_driver_wait):
-    for link in links:
-        side_driver.get(link)
-        # side_driver_wait.until(EC.presence_of_element_located(By.TAG_NAME, "body"))
-        time.sleep(random.uniform(2,3))
 
-        article_elem = side_driver.find_element(By.CSS_SELECTOR, "div[role='presentation']")
-        h1_elem = article_elem.find_element(By.CSS_SELECTOR, "h1[dir='auto']")
-        print(h1_elem)
\ No newline at end of file
+def read_post(session, link):
+    """Open one post and return its caption once the page has rendered it."""
+    session.get(link)
+    article_elem = session.wait.until(
+        EC.presence_of_element_located((By.CSS_SELECTOR, "div[role='presentation']"))
+    )
+    h1_elem = session.wait.until(
+        lambda _: article_elem.find_element(By.CSS_SELECTOR, "h1[dir='auto']")
+    )
+    return {"link": link, "caption": h1_elem.text}
+
+
+def read_post_network(session, link, capture, timeout=CAPTURE_TIMEOUT):
+    """
+    Open one post and parse its data from the API responses the page fetches.
+
+    Falls back to reading the DOM if no matching payload arrives within
+    `timeout` seconds (kept short, since the page is loading meanwhile).
+    """
+    shortcode = shortcode_of(link)
+    capture.reset()
+    session.get(link)
+
+    found = {}
+
+    def media_received(_):
+        for payload in capture.payloads():
+            media = find_media(payload, shortcode)
+            if media:
+                found.update(parse_media(media))
+                return True
+        return False
+
+    try:
+        WebDriverWait(session.driver, timeout, poll_frequency=0.2).until(
+            media_received
+        )
+    except TimeoutException:
+        print(f"⚠️ No post payload captured for {link}, reading the page instead.")
+        return read_post(session, link)
+    return {"link": link, **found}
+
+
+def collect_links(
+    links, side_pool, pace=(2, 3), mode="dom", batch_size=10, checkout_timeout=60
+):
+    """
+    Visit post links across every session of a BrowserPool at once.
+
+    One worker per pooled profile checks a session out, reads up to
+    `batch_size` links through it and checks it back in, so the pool can
+    recycle sessions (page count, memory growth) during the run. Each
+    session waits at least a random `pace` seconds between its own page
+    loads. Results come back in the same order as `links` (None for posts
+    that failed to load).
+
+    mode="network" parses caption, author and counts from captured API
+    responses (pool created with capture_network=True); "dom" reads the
+    rendered caption.
+    """
+    pending = queue.Queue()
+    for index, link in enumerate(links):
+        pending.put((index, link))
+    results = [None] * len(links)
+
+    def read_batch(session):
+        capture = NetworkCapture(session.driver) if mode == "network" else None
+        for _ in range(batch_size):
+            try:
+                index, link = pending.get_nowait()
+            except queue.Empty:
+                return
+
+            # Per-session pacing, so each profile still browses at a human rate
+            time.sleep(max(0.0, session.next_visit - time.monotonic()))
+            session.next_visit = time.monotonic() + random.uniform(*pace)
+
+            try:
+                if capture:
+                    results[index] = read_post_network(session, link, capture)
+                else:
+                    results[index] = read_post(session, link)
+                print(results[index])
+            except WDE as e:
+                print(f"❌ Failed to read {link}: {e.__class__.__name__}")
+
+    def worker():
+        # Failures are contained per batch, so one broken session never
+        # discards the results the other sessions have already collected
+        while not pending.empty():
+            try:
+                session = side_pool.checkout(timeout=checkout_timeout)
+            except queue.Empty:
+                print("❌ No side browser became free, leaving the rest to others.")
+                return
+            except Exception as e:
+                print(f"❌ No side browser available ({e}), leaving the rest to others.")
+                return
+
+            try:
+                read_batch(session)
+            except Exception as e:
+                print(f"❌ Batch on {session.profile} failed: {e}")
+
+            try:
+                side_pool.checkin(session)
+            except Exception as e:
+                print(f"❌ Lost side browser {session.profile}: {e}")
+                return
+
+    with ThreadPoolExecutor(max_workers=side_pool.size) as executor:
+        futures = [executor.submit(worker) for _ in range(side_pool.size)]
+        for future in futures:
+            future.result()
+
+    return results